@@ -6,12 +6,22 @@ __version__ = "1.0.0"
 
 success = False
 try:
-    from src.raphlit import *
+    from src import raphlit as _raphlit
 except ModuleNotFoundError as e:
     try:
-        from .src.raphlit import *
+        from .src import raphlit as _raphlit
         success = True
     except Exception as f:
         raise f
     if not success:
         raise e
+
+__all__ = _raphlit.__all__
+
+
+def __getattr__(name: str):  # Forwarded, so components stay imported on first access (a star import would import them all)
+    return getattr(_raphlit, name)
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
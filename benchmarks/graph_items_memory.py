@@ -0,0 +1,77 @@
+"""
+Memory used per node by GraphItems, compared to the previous storage of one pydantic model per node and edge.
+
+Usage :
+    python benchmarks/graph_items_memory.py [--nodes 20000] [--edges-per-node 5]
+"""
+
+from typing import Callable, Dict
+
+import argparse
+import gc
+import json
+import pickle
+import random
+import tracemalloc
+
+from raphlit.interactive_graph import GraphItems, Node, Edge, NodeConfig, EdgeConfig
+
+
+def measure(build: Callable[[], object]) -> Dict[str, int]:
+    """Bytes allocated by build() and kept alive by its result, and the size of the pickled result."""
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    gc.collect()
+    allocated, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"allocated": allocated, "pickled": len(pickle.dumps(result))}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--nodes", type=int, default=20_000)
+    parser.add_argument("--edges-per-node", type=int, default=5)
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    node_count = args.nodes
+    edge_count = node_count * args.edges_per_node
+    labels = [f"node {i}" for i in range(node_count)]
+    starts = [rng.randrange(node_count) for _ in range(edge_count)]
+    ends = [rng.randrange(node_count) for _ in range(edge_count)]
+    node_config, edge_config = NodeConfig(), EdgeConfig()
+
+    def models():  # How GraphItems stored nodes and edges before
+        return (
+            [Node(external_id=i, label=labels[i], hover="", value=i, config=node_config) for i in range(node_count)],
+            [Edge(config=edge_config, start=start, end=end) for start, end in zip(starts, ends)],
+        )
+
+    def columns():
+        items = GraphItems(node_config={"default": node_config}, edge_config={"default": edge_config})
+        items.add_nodes(range(node_count), labels=labels)
+        items.add_edges(starts, ends)
+        return items
+
+    results = {"nodes": node_count, "edges": edge_count}
+    for name, build in (("models", models), ("columns", columns)):
+        measured = measure(build)
+        results[name] = {
+            "bytes_per_node": measured["allocated"] / node_count,
+            "pickled_bytes_per_node": measured["pickled"] / node_count,
+        }
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{node_count} nodes, {edge_count} edges (edges included in the per node figures)")
+    print(f"{'storage':<10}{'bytes/node':>14}{'pickled bytes/node':>22}")
+    for name in ("models", "columns"):
+        print(f"{name:<10}{results[name]['bytes_per_node']:>14.0f}{results[name]['pickled_bytes_per_node']:>22.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Cold import time of raphlit and of each of its components, every measure in a fresh interpreter.
+
+Each component is measured on its own (import raphlit, then access the component), which is what a page using only that widget pays.
+Components whose optional dependencies are not installed are reported as unavailable.
+
+Usage :
+    python benchmarks/import_time.py [--repeat 5] [--components PersistentItem InteractiveGraph ...] [--json]
+"""
+
+from typing import Any, Dict, List, Optional
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+DEFAULT_COMPONENTS = ["PersistentItem", "PydanticForm", "InteractiveGraph", "LangGraphChat"]
+
+# Prints the seconds spent importing, and the number of modules loaded
+SCRIPT = """
+import sys, time
+start = time.perf_counter()
+import raphlit
+{access}
+print(time.perf_counter() - start, len(sys.modules))
+"""
+
+
+def measure(component: Optional[str], repeat: int) -> Dict[str, Any]:
+    access = f"raphlit.{component}" if component else ""
+    seconds, modules = [], 0
+    for _ in range(repeat):
+        result = subprocess.run([sys.executable, "-c", SCRIPT.format(access=access)], capture_output=True, text=True)
+        if result.returncode != 0:
+            return {"component": component or "raphlit", "available": False, "error": result.stderr.strip().splitlines()[-1]}
+        elapsed, modules = result.stdout.split()
+        seconds.append(float(elapsed))
+    return {
+        "component": component or "raphlit",
+        "available": True,
+        "median_seconds": statistics.median(seconds),
+        "min_seconds": min(seconds),
+        "modules": int(modules),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5, help="Fresh interpreters per measure")
+    parser.add_argument("--components", nargs="*", default=DEFAULT_COMPONENTS)
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON")
+    args = parser.parse_args()
+
+    results: List[Dict[str, Any]] = [measure(None, args.repeat)]
+    results += [measure(component, args.repeat) for component in args.components]
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{'component':<20}{'median ms':>12}{'min ms':>10}{'modules':>10}")
+    for result in results:
+        if result["available"]:
+            print(f"{result['component']:<20}{result['median_seconds'] * 1000:>12.1f}{result['min_seconds'] * 1000:>10.1f}{result['modules']:>10}")
+        else:
+            print(f"{result['component']:<20}  unavailable : {result['error']}")
+
+
+if __name__ == "__main__":
+    main()
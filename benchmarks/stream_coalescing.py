@@ -0,0 +1,64 @@
+"""
+Deltas sent per streamed response with and without ChunkCoalescer, on a simulated token stream.
+
+Usage :
+    python benchmarks/stream_coalescing.py [--tokens 400] [--token-interval 0.005] [--max-delay 0.05] [--max-chars 512]
+"""
+
+from typing import Dict, Generator
+
+import argparse
+import json
+import time
+
+from raphlit._chunk_coalescer import ChunkCoalescer, StreamMetrics
+
+
+def tokens(count: int, interval: float) -> Generator[str, None, None]:
+    """A model answering at one token every interval seconds."""
+    for i in range(count):
+        time.sleep(interval)
+        yield f"token{i} "
+
+
+def measure(coalescer: ChunkCoalescer, count: int, interval: float) -> Dict[str, float]:
+    metrics = StreamMetrics()
+    for _ in coalescer.coalesce(tokens(count, interval), metrics):
+        pass  # st.write_stream sends one delta per item
+    return {
+        "deltas": metrics.deltas,
+        "chunks_per_delta": metrics.chunks_per_delta,
+        "characters_per_second": metrics.characters_per_second,
+        "first_delta_ms": (metrics.first_delta_seconds or 0.0) * 1000,
+        "max_hold_ms": metrics.max_hold_seconds * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tokens", type=int, default=400)
+    parser.add_argument("--token-interval", type=float, default=0.005)
+    parser.add_argument("--max-delay", type=float, default=0.05)
+    parser.add_argument("--max-chars", type=int, default=512)
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON")
+    args = parser.parse_args()
+
+    results = {
+        "tokens": args.tokens,
+        "per_token": measure(ChunkCoalescer(max_delay=0.0, max_chars=0), args.tokens, args.token_interval),
+        "coalesced": measure(ChunkCoalescer(max_delay=args.max_delay, max_chars=args.max_chars), args.tokens, args.token_interval),
+    }
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{args.tokens} tokens, one every {args.token_interval * 1000:.1f} ms")
+    print(f"{'stream':<12}{'deltas':>8}{'chunks/delta':>14}{'chars/s':>10}{'first delta ms':>16}{'max hold ms':>13}")
+    for name in ("per_token", "coalesced"):
+        r = results[name]
+        print(f"{name:<12}{r['deltas']:>8}{r['chunks_per_delta']:>14.1f}{r['characters_per_second']:>10.0f}{r['first_delta_ms']:>16.1f}{r['max_hold_ms']:>13.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+"""
+Headless benchmarks of the Raphlit widgets, run through Streamlit's AppTest so the real script code paths are measured.
+
+Covers GraphItems construction, InteractiveGraph.compute_figure, select_node -> on_update round trips (and delta restyles),
+PersistentItem.st lookups, and LangGraphChat.display over histories of different lengths with a local stub graph.
+
+Usage :
+    python benchmarks/widgets.py [--nodes 1000 10000 100000] [--messages 10 100 1000] [--json] [--output results.json]
+"""
+
+from typing import Any, Dict, List
+
+import argparse
+import json
+import platform
+import time
+
+from streamlit.testing.v1 import AppTest
+
+TIMEOUT = 900  # Seconds, laying out 100k nodes takes a while
+
+
+
+# ====================================================================== SCRIPTS
+# Run by AppTest, they must import everything they use. Timings are written in st.session_state["bench"].
+
+
+
+def graph_script(nodes: int, iterations: int):
+    import random
+    import time
+    import streamlit as st
+    from raphlit import InteractiveGraph, GraphItems, NodeConfig, EdgeConfig, ForceDirectedLayout
+
+    timings = st.session_state["bench"] = {}
+
+    class BenchGraph(InteractiveGraph):
+
+        def build_nodes(self) -> GraphItems:
+            rng = random.Random(0)
+            items = GraphItems(
+                node_config={"default": NodeConfig(), "selected": NodeConfig(color="red", size=20)},
+                edge_config={"default": EdgeConfig(), "selected": EdgeConfig(color="red", width=4)},
+            )
+            items.add_nodes(range(nodes), labels=[str(i) for i in range(nodes)])
+            items.add_edges([rng.randrange(nodes) for _ in range(2 * nodes)], [rng.randrange(nodes) for _ in range(2 * nodes)])
+            return items
+
+        def on_update(self):
+            start = time.perf_counter()
+            self.graph_items = self.build_nodes()
+            timings["graph_items"] = time.perf_counter() - start
+
+            start = time.perf_counter()
+            self.figure = self.compute_figure(layout=ForceDirectedLayout(iterations=iterations, seed=0))
+            timings["compute_figure"] = time.perf_counter() - start
+
+    graph = BenchGraph.st("bench_graph")
+    graph.delta_update = st.session_state.get("bench_delta", False)
+
+    select = st.session_state.pop("bench_select", None)
+    start = time.perf_counter()
+    if select is not None:
+        graph.select_node(external_ids=[select])
+    graph.display()
+    timings["display"] = time.perf_counter() - start
+
+
+def persistent_script(lookups: int):
+    import time
+    import streamlit as st
+    from raphlit import PersistentItem
+
+    class BenchItem(PersistentItem):
+        def __init__(self):
+            self.value = 0
+
+    BenchItem.persist("bench_item")
+    start = time.perf_counter()
+    for _ in range(lookups):
+        BenchItem.st("bench_item")
+    st.session_state["bench"] = {"lookup": (time.perf_counter() - start) / lookups}
+
+
+def chat_script(messages: int):
+    import time
+    import streamlit as st
+    from langchain_core.messages import AIMessage, AIMessageChunk, HumanMessage
+    from raphlit import LangGraphChat
+
+    class History:
+        def __init__(self):
+            self.messages = []
+
+        def append(self, type: str, content: str):
+            self.messages.append(HumanMessage(content) if type == "human" else AIMessage(content))
+
+    class State:
+        def __init__(self):
+            self.history = History()
+            self.input_hint = "Write something..."
+
+    class LocalGraph:
+        """Stands in for a raphlib graph : answers every message with a few streamed tokens."""
+        def __init__(self):
+            self.state = State()
+
+        def stream(self, *args):
+            def answer():
+                tokens = ["Some ", "*markdown* ", "answer ", "with ", "`code`."]
+                yield from (AIMessageChunk(content=token) for token in tokens)
+                self.state.history.append("ai", "".join(tokens))
+            return answer()
+
+    class BenchChat(LangGraphChat):
+        def create_graph(self):
+            self.graph = LocalGraph()
+            for i in range(messages):
+                self.graph.state.history.append("human" if i % 2 else "ai", f"Message **{i}** with some `markdown`.")
+
+    chat = BenchChat.st("bench_chat", history_window=messages)
+    start = time.perf_counter()
+    chat.display(height=600)
+    st.session_state["bench"] = {"display": time.perf_counter() - start}
+
+
+
+# ====================================================================== HARNESS
+
+
+
+def run(at: AppTest) -> Dict[str, float]:
+    start = time.perf_counter()
+    at.run(timeout=TIMEOUT)
+    elapsed = time.perf_counter() - start
+    if at.exception:
+        raise RuntimeError(at.exception[0].message)
+    return dict(at.session_state["bench"], script_run=elapsed)
+
+
+def bench_graph(nodes: int, iterations: int) -> List[Dict[str, Any]]:
+    at = AppTest.from_function(graph_script, kwargs={"nodes": nodes, "iterations": iterations}, default_timeout=TIMEOUT)
+    first = run(at)
+
+    at.session_state["bench_select"] = 1
+    roundtrip = run(at)  # select_node -> on_update, the layout comes from the cache
+
+    at.session_state["bench_delta"] = True
+    at.session_state["bench_select"] = 2
+    restyle = run(at)  # select_node -> restyle of the existing figure
+
+    return [
+        {"benchmark": "graph_items", "size": nodes, "seconds": first["graph_items"]},
+        {"benchmark": "compute_figure", "size": nodes, "seconds": first["compute_figure"]},
+        {"benchmark": "first_display", "size": nodes, "seconds": first["script_run"]},
+        {"benchmark": "select_roundtrip", "size": nodes, "seconds": roundtrip["display"]},
+        {"benchmark": "select_restyle", "size": nodes, "seconds": restyle["display"]},
+    ]
+
+
+def bench_persistent(lookups: int) -> List[Dict[str, Any]]:
+    at = AppTest.from_function(persistent_script, kwargs={"lookups": lookups}, default_timeout=TIMEOUT)
+    return [{"benchmark": "persistent_st_lookup", "size": lookups, "seconds": run(at)["lookup"]}]
+
+
+def bench_chat(messages: int) -> List[Dict[str, Any]]:
+    at = AppTest.from_function(chat_script, kwargs={"messages": messages}, default_timeout=TIMEOUT)
+    first = run(at)  # Streams the first answer
+    rerun = run(at)  # Only displays the history
+
+    at.chat_input[0].set_value("Hello")
+    start = time.perf_counter()
+    at.run(timeout=TIMEOUT)  # Appends the message, reruns and streams the answer
+    turn = time.perf_counter() - start
+
+    return [
+        {"benchmark": "chat_first_display", "size": messages, "seconds": first["display"]},
+        {"benchmark": "chat_rerun", "size": messages, "seconds": rerun["display"]},
+        {"benchmark": "chat_turn", "size": messages, "seconds": turn},
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--nodes", type=int, nargs="*", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--messages", type=int, nargs="*", default=[10, 100, 1_000])
+    parser.add_argument("--lookups", type=int, default=10_000)
+    parser.add_argument("--layout-iterations", type=int, default=10, help="Iterations of ForceDirectedLayout")
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON")
+    parser.add_argument("--output", help="Also write the JSON results to this file")
+    args = parser.parse_args()
+
+    results = []
+    for nodes in args.nodes:
+        results += bench_graph(nodes, args.layout_iterations)
+    results += bench_persistent(args.lookups)
+    for messages in args.messages:
+        results += bench_chat(messages)
+
+    report = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "layout_iterations": args.layout_iterations,
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"{'benchmark':<24}{'size':>10}{'ms':>12}")
+    for result in results:
+        print(f"{result['benchmark']:<24}{result['size']:>10}{result['seconds'] * 1000:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,93 @@
 """
 A set of components for building Streamlit apps.
+
+Components are imported on first access, so a page only pays for the widgets it uses :
+the graph needs the "graph" extra (numpy, networkx, plotly) and the chat needs the "chat" extra (langchain) and raphlib,
+which no extra installs.
 """
 
-from ._persistent_item import PersistentItem
-from .pydantic_form import PydanticForm
-from .interactive_graph import InteractiveGraph, GraphItems, NodeConfig, EdgeConfig, display_interactive_graph_example
-from .langgraph_chat import LangGraphChat
-from .rerun_flag import set_rerun_flag, rerun_if_flag
+from typing import TYPE_CHECKING
+
+import importlib
+
+# name -> (module, extra providing its dependencies)
+_LAZY = {
+    "PersistentItem": ("._persistent_item", None),
+    "SpillStore": ("._spill_store", None),
+    "enable_spill_to_disk": ("._spill_store", None),
+    "PydanticForm": (".pydantic_form", None),
+    "InteractiveGraph": (".interactive_graph", "graph"),
+    "GraphItems": (".interactive_graph", "graph"),
+    "GraphItemsDiff": (".interactive_graph", "graph"),
+    "NodeConfig": (".interactive_graph", "graph"),
+    "EdgeConfig": (".interactive_graph", "graph"),
+    "LevelOfDetail": (".interactive_graph", "graph"),
+    "display_interactive_graph_example": (".interactive_graph", "graph"),
+    "LayoutCache": ("._layout_cache", "graph"),
+    "LayoutArtifact": (".layout_artifact", "graph"),
+    "build_layout_artifact": (".layout_artifact", "graph"),
+    "LayoutEngine": ("._layout_engine", "graph"),
+    "SpringLayout": ("._layout_engine", "graph"),
+    "ForceDirectedLayout": ("._layout_engine", "graph"),
+    "SelectDispatcher": ("._select_dispatcher", None),
+    "SelectionCache": ("._selection_cache", None),
+    "LangGraphChat": (".langgraph_chat", "chat"),
+    "ChatLog": ("._chat_log", "chat"),
+    "ChunkCoalescer": ("._chunk_coalescer", None),
+    "StreamMetrics": ("._chunk_coalescer", None),
+    "BackgroundStream": ("._background_stream", None),
+    "PhaseRecord": ("._profiling", None),
+    "ProfileSink": ("._profiling", None),
+    "LogSink": ("._profiling", None),
+    "RingBufferSink": ("._profiling", None),
+    "PrometheusFileSink": ("._profiling", None),
+    "enable_profiling": ("._profiling", None),
+    "display_profile": ("._profiling", None),
+    "set_rerun_flag": (".rerun_flag", None),
+    "rerun_if_flag": (".rerun_flag", None),
+    "pending_reruns": (".rerun_flag", None),
+    "last_reruns": (".rerun_flag", None),
+}
+
+_NOT_IN_EXTRAS = {"raphlib"}  # Dependencies to install separately
+
+__all__ = list(_LAZY)
+
+
+def __getattr__(name: str):
+    if name not in _LAZY:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module_name, extra = _LAZY[name]
+    try:
+        module = importlib.import_module(module_name, __name__)
+    except ImportError as e:
+        if extra is None or e.name is None or e.name.startswith(__name__):
+            raise
+        package = e.name.split(".")[0]
+        hint = f"install {package} separately, no raphlit extra provides it" if package in _NOT_IN_EXTRAS else f"see pip install raphlit[{extra}]"
+        raise ImportError(f"raphlit.{name} needs {e.name}, which is not installed ({hint})", name=e.name) from e
+    value = getattr(module, name)
+    globals()[name] = value  # Later accesses skip __getattr__
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY))
+
+
+if TYPE_CHECKING:  # Eager imports for type checkers and IDEs
+    from ._persistent_item import PersistentItem
+    from ._spill_store import SpillStore, enable_spill_to_disk
+    from .pydantic_form import PydanticForm
+    from .interactive_graph import InteractiveGraph, GraphItems, GraphItemsDiff, NodeConfig, EdgeConfig, LevelOfDetail, display_interactive_graph_example
+    from ._layout_cache import LayoutCache
+    from .layout_artifact import LayoutArtifact, build_layout_artifact
+    from ._layout_engine import LayoutEngine, SpringLayout, ForceDirectedLayout
+    from ._select_dispatcher import SelectDispatcher
+    from ._selection_cache import SelectionCache
+    from .langgraph_chat import LangGraphChat
+    from ._chat_log import ChatLog
+    from ._chunk_coalescer import ChunkCoalescer, StreamMetrics
+    from ._background_stream import BackgroundStream
+    from ._profiling import PhaseRecord, ProfileSink, LogSink, RingBufferSink, PrometheusFileSink, enable_profiling, display_profile
+    from .rerun_flag import set_rerun_flag, rerun_if_flag, pending_reruns, last_reruns
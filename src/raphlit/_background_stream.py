@@ -0,0 +1,135 @@
+"""
+Runs a stream on a worker thread so the script thread only waits on a queue, and can stop waiting at any time.
+"""
+
+from typing import (
+    Any,
+    Callable,
+    Iterable,
+    Optional,
+)
+
+import queue
+import threading
+import time
+
+_END = object()
+_ERROR = object()
+
+
+
+class BackgroundStream:
+    """
+    Iterates a stream on a worker thread, feeding a bounded queue that iterating this object drains.
+    The worker stops at the next event once cancelled, closing the stream if it is a generator.
+    """
+
+    def __init__(self, stream: Iterable[Any], maxsize: int = 64, poll_interval: float = 0.1, on_wait: Optional[Callable[[float], None]] = None):
+        """
+        Parameters:
+            stream (Iterable[Any]):
+                The stream to run, such as a raphlib graph stream.
+            maxsize (int):
+                Maximum number of events waiting to be read, the worker pauses when the queue is full.
+            poll_interval (float):
+                Seconds between two calls to on_wait while no event is available.
+            on_wait (Callable[[float], None], None):
+                Called on the reading thread with the seconds spent waiting for the next event, and with 0 once it arrived.
+                Displaying something from there lets Streamlit interrupt the script when the user reruns it.
+        """
+        self.stream = stream
+        self.poll_interval = poll_interval
+        self.on_wait = on_wait
+        self._queue: queue.Queue = queue.Queue(maxsize=maxsize)
+        self._cancelled = threading.Event()
+        self._finished = threading.Event()
+        self._thread = threading.Thread(target=self._work, name="raphlit_stream", daemon=True)
+
+    def start(self) -> 'BackgroundStream':
+        self._thread.start()
+        return self
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    @property
+    def finished(self) -> bool:
+        """Whether the worker stopped, because the stream ended, failed or was cancelled."""
+        return self._finished.is_set()
+
+    def cancel(self, wait: bool = False, timeout: Optional[float] = None):
+        """
+        Stop the worker at its next event. Events already queued are dropped.
+
+        Parameters:
+            wait (bool):
+                Whether to wait for the worker to stop, it may be in the middle of a slow tool call.
+            timeout (float, None):
+                Maximum seconds to wait.
+        """
+        self._cancelled.set()
+        self._drain()
+        if wait:
+            self._finished.wait(timeout)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> Any:
+        waiting_since, waited = time.monotonic(), False
+        while True:
+            try:
+                kind, item = self._queue.get(timeout=self.poll_interval)
+            except queue.Empty:
+                if self.cancelled:
+                    raise StopIteration
+                if self.on_wait is not None:
+                    self.on_wait(time.monotonic() - waiting_since)
+                    waited = True
+                continue
+
+            if waited:
+                self.on_wait(0.0)
+            if kind is _END:
+                self._queue.put_nowait((_END, None))  # Later reads end too
+                raise StopIteration
+            if kind is _ERROR:
+                raise item
+            return item
+
+    def _work(self):
+        try:
+            for event in self.stream:
+                if not self._put(event):
+                    break
+        except BaseException as e:
+            self._put(e, kind=_ERROR)
+        finally:
+            if self.cancelled and hasattr(self.stream, "close"):
+                self.stream.close()  # Runs the generator's cleanup, on the thread that ran it
+            self._finished.set()
+            self._put(None, kind=_END, force=True)
+
+    def _put(self, item: Any, kind: Any = None, force: bool = False) -> bool:
+        """
+        Queue an event, waiting for room. Returns False if cancelled meanwhile,
+        unless force is set in which case the queue is emptied to make room.
+        """
+        while True:
+            if self.cancelled:
+                if not force:
+                    return False
+                self._drain()
+            try:
+                self._queue.put((kind, item), timeout=self.poll_interval)
+                return True
+            except queue.Full:
+                pass
+
+    def _drain(self):
+        try:
+            while True:
+                self._queue.get_nowait()
+        except queue.Empty:
+            pass
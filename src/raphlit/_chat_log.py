@@ -0,0 +1,97 @@
+"""
+An append-only chat history on disk, so a conversation costs the same memory however long it runs.
+Messages are JSON lines in a log file, and a sidecar index file holds the byte offset of each of them,
+so any range of messages is read with two seeks and nothing is kept in memory.
+"""
+
+from typing import (
+    Iterable,
+    List,
+    Optional,
+)
+from langchain_core.messages import BaseMessage, message_to_dict, messages_from_dict
+
+import json
+import os
+import struct
+import threading
+
+_OFFSET = struct.Struct("<q")  # One per message in the index file
+
+
+
+class ChatLog:
+    """
+    Messages of a conversation in an append-only log file at path, with their offsets in path + ".idx".
+    An existing log is reopened as is, so a conversation can be resumed by another session or worker.
+    Messages are serialized with langchain's message_to_dict.
+    """
+
+    def __init__(self, path: str):
+        """
+        Parameters:
+            path (str):
+                The log file, created along with its index if missing.
+        """
+        self.path = path
+        self.index_path = path + ".idx"
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        for file in (self.path, self.index_path):
+            open(file, "ab").close()
+
+        # An interrupted append may leave a partial offset behind, the message it pointed to is dropped
+        size = os.path.getsize(self.index_path)
+        if size % _OFFSET.size:
+            os.truncate(self.index_path, size - size % _OFFSET.size)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return os.path.getsize(self.index_path) // _OFFSET.size
+
+    def append(self, message: BaseMessage):
+        self.extend([message])
+
+    def extend(self, messages: Iterable[BaseMessage]):
+        """Append messages, the log first and then their offsets, so a crash never indexes a partial message."""
+        records = [(json.dumps(message_to_dict(message), ensure_ascii=False) + "\n").encode() for message in messages]
+        if not records:
+            return
+        with self._lock, open(self.path, "ab") as log, open(self.index_path, "ab") as index:
+            offset = log.seek(0, os.SEEK_END)
+            log.write(b"".join(records))
+            log.flush()
+            offsets = []
+            for record in records:
+                offsets.append(_OFFSET.pack(offset))
+                offset += len(record)
+            index.write(b"".join(offsets))
+
+    def read(self, start: int = 0, stop: Optional[int] = None) -> List[BaseMessage]:
+        """The messages from start to stop (excluded), like a slice of the history."""
+        start, stop, _ = slice(start, stop).indices(len(self))
+        if start >= stop:
+            return []
+        with open(self.index_path, "rb") as index:
+            index.seek(start * _OFFSET.size)
+            first = _OFFSET.unpack(index.read(_OFFSET.size))[0]
+        with open(self.path, "rb") as log:
+            log.seek(first)
+            # Until the end of the last message, bytes of an interrupted append may follow it
+            lines = [log.readline() for _ in range(stop - start)]
+        return messages_from_dict([json.loads(line) for line in lines])
+
+    def tail(self, count: int) -> List[BaseMessage]:
+        """The last count messages."""
+        return self.read(max(0, len(self) - count))
@@ -0,0 +1,96 @@
+"""
+Batches streamed text chunks before they are written, so a response is sent as a few deltas instead of one per token.
+"""
+
+from typing import (
+    Generator,
+    Iterable,
+    Optional,
+)
+from pydantic import BaseModel
+
+import time
+
+
+
+class StreamMetrics(BaseModel):
+    """What a coalesced stream received and emitted."""
+    chunks: int = 0  # Chunks received
+    deltas: int = 0  # Batches emitted
+    characters: int = 0
+    seconds: float = 0.0  # From the first chunk to the end of the stream
+    first_delta_seconds: Optional[float] = None  # From the start of the stream to the first emitted batch
+    max_hold_seconds: float = 0.0  # Longest a chunk was held back before being emitted
+
+    @property
+    def chunks_per_delta(self) -> float:
+        return self.chunks / self.deltas if self.deltas else 0.0
+
+    @property
+    def characters_per_second(self) -> float:
+        return self.characters / self.seconds if self.seconds else 0.0
+
+
+
+class ChunkCoalescer:
+    """
+    Joins consecutive chunks of a stream until max_delay seconds passed since the oldest one,
+    or until they hold max_chars characters. The first chunk is emitted right away so the response starts as soon as possible.
+    Chunks are only emitted when the next one arrives or the stream ends, so a slow stream emits its chunks one by one.
+    """
+
+    def __init__(self, max_delay: float = 0.05, max_chars: int = 512):
+        """
+        Parameters:
+            max_delay (float):
+                Seconds a chunk may wait for the following ones.
+            max_chars (int):
+                Number of characters after which the batch is emitted without waiting.
+        """
+        self.max_delay = max_delay
+        self.max_chars = max_chars
+
+    def coalesce(self, chunks: Iterable[str], metrics: Optional[StreamMetrics] = None) -> Generator[str, None, None]:
+        """
+        Yield the chunks joined in batches.
+
+        Parameters:
+            chunks (Iterable[str]):
+                The stream to batch.
+            metrics (StreamMetrics, None):
+                Updated as the stream is consumed.
+        """
+        metrics = metrics if metrics is not None else StreamMetrics()
+        start = time.perf_counter()
+        first_chunk = None
+        buffer, size, held_since = [], 0, 0.0
+
+        def emit(now: float) -> str:
+            nonlocal buffer, size
+            metrics.deltas += 1
+            metrics.max_hold_seconds = max(metrics.max_hold_seconds, now - held_since)
+            if metrics.first_delta_seconds is None:
+                metrics.first_delta_seconds = now - start
+            text, buffer, size = "".join(buffer), [], 0
+            return text
+
+        for chunk in chunks:
+            now = time.perf_counter()
+            if first_chunk is None:
+                first_chunk = now
+            metrics.chunks += 1
+            metrics.characters += len(chunk)
+
+            if not buffer:
+                held_since = now
+            buffer.append(chunk)
+            size += len(chunk)
+
+            if metrics.deltas == 0 or size >= self.max_chars or now - held_since >= self.max_delay:
+                yield emit(now)
+            metrics.seconds = now - first_chunk
+
+        if buffer:
+            now = time.perf_counter()
+            yield emit(now)
+            metrics.seconds = now - first_chunk
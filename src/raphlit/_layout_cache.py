@@ -0,0 +1,143 @@
+"""
+A bounded cache of graph layouts keyed by topology.
+Lets a graph keep its node positions across reruns instead of re-laying out from scratch.
+"""
+
+from typing import (
+    Any,
+    Dict,
+    Hashable,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
+from collections import OrderedDict
+
+import random
+import numpy as np
+import networkx as nx
+
+from ._layout_engine import LayoutEngine, SpringLayout
+
+Position = Tuple[float, ...]
+
+
+
+class LayoutCache:
+    """
+    LRU cache of node positions, keyed by the topology (node and edge external ids) they were computed for.
+
+    Unchanged topologies reuse their positions outright.
+    Topologies sharing most of their nodes with a cached one are warm-started from it :
+    known nodes keep their position and only new nodes are laid out.
+    """
+
+    def __init__(self, max_size: int = 8, min_overlap: float = 0.5, engine: Optional[LayoutEngine] = None):
+        """
+        Parameters:
+            max_size (int):
+                Maximum number of layouts kept, the least recently used one is evicted first.
+            min_overlap (float):
+                Minimum share of the new topology's nodes that must be known by a cached layout
+                for it to be used as a warm start. Below this, the layout is computed from scratch.
+            engine (LayoutEngine, None):
+                The default engine computing the layouts. Defaults to a 3D SpringLayout.
+        """
+        self.max_size = max_size
+        self.min_overlap = min_overlap
+        self.engine = engine or SpringLayout()
+        self._layouts: OrderedDict[int, Dict[Hashable, Position]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._layouts)
+
+    @staticmethod
+    def topology_key(external_ids: Sequence[Hashable], edges: Sequence[Tuple[Hashable, Hashable]]) -> int:
+        """A key that only depends on the sets of nodes and edges, not on their order."""
+        return hash((len(external_ids), frozenset(external_ids), len(edges), frozenset(edges)))
+
+    def get(self, key: int) -> Optional[Dict[Hashable, Position]]:
+        positions = self._layouts.get(key)
+        if positions is not None:
+            self._layouts.move_to_end(key)
+        return positions
+
+    def put(self, key: int, positions: Dict[Hashable, Position]):
+        self._layouts[key] = positions
+        self._layouts.move_to_end(key)
+        while len(self._layouts) > self.max_size:
+            self._layouts.popitem(last=False)
+
+    def clear(self):
+        self._layouts.clear()
+
+    def nearest(self, external_ids: Sequence[Hashable], dim: int) -> Optional[Dict[Hashable, Position]]:
+        """The cached layout of that dimension knowing the most of the given nodes, if it knows at least min_overlap of them."""
+        if not external_ids:
+            return None
+        best, best_overlap = None, 0
+        for positions in reversed(self._layouts.values()):  # Most recent first wins ties
+            if len(next(iter(positions.values()), ())) != dim:
+                continue
+            overlap = sum(1 for external_id in external_ids if external_id in positions)
+            if overlap > best_overlap:
+                best, best_overlap = positions, overlap
+        if best is None or best_overlap / len(external_ids) < self.min_overlap:
+            return None
+        return best
+
+    def layout(self, digraph: nx.DiGraph, external_ids: Sequence[Hashable], engine: Optional[LayoutEngine] = None) -> List[Position]:
+        """
+        Layout of the digraph that reuses or warm-starts from cached positions.
+
+        Parameters:
+            digraph (nx.DiGraph):
+                The graph to lay out, its nodes are the local ids 0..n-1.
+            external_ids (Sequence[Hashable]):
+                The external id of each local id, positions are cached by external id
+                so they survive the graph items being rebuilt in a different order.
+            engine (LayoutEngine, None):
+                The engine computing missing positions. Defaults to self.engine.
+        """
+        engine = engine or self.engine
+        edges = [(external_ids[u], external_ids[v]) for u, v in digraph.edges]
+        key = hash((engine.cache_key(), self.topology_key(external_ids, edges)))
+
+        positions = self.get(key)
+        if positions is None:
+            positions = self._compute(digraph, external_ids, engine)
+            self.put(key, positions)
+
+        return [positions[external_id] for external_id in external_ids]
+
+    def _compute(self, digraph: nx.DiGraph, external_ids: Sequence[Hashable], engine: LayoutEngine) -> Dict[Hashable, Position]:
+        edges = np.array(list(digraph.edges), dtype=np.intp).reshape(-1, 2)
+        previous = self.nearest(external_ids, engine.dim)
+
+        if previous is None:  # Cold start
+            local = engine.run(len(external_ids), edges)
+
+        else:
+            known = np.fromiter((external_id in previous for external_id in external_ids), dtype=bool, count=len(external_ids))
+            if known.all():  # Same nodes, nothing needs to move
+                return {external_id: previous[external_id] for external_id in external_ids}
+
+            initial: Dict[int, Position] = {int(i): previous[external_ids[i]] for i in np.flatnonzero(known)}
+            rng = random.Random()
+            for i in np.flatnonzero(~known).tolist():
+                initial[i] = self._seed_position(digraph, i, initial, rng, engine.dim)
+
+            local = engine.run(len(external_ids), edges, initial=np.array([initial[i] for i in range(len(external_ids))]), fixed=known)
+
+        return {external_id: tuple(position) for external_id, position in zip(external_ids, local.tolist())}
+
+    def _seed_position(self, digraph: nx.DiGraph, node: int, placed: Dict[int, Any], rng: random.Random, dim: int) -> Position:
+        """Start a new node next to its already placed neighbours so the warm start converges quickly."""
+        neighbours = [placed[n] for n in nx.all_neighbors(digraph, node) if n in placed]
+        if not neighbours:
+            return tuple(rng.uniform(-1, 1) for _ in range(dim))
+        return tuple(
+            sum(position[d] for position in neighbours) / len(neighbours) + rng.uniform(-0.05, 0.05)
+            for d in range(dim)
+        )
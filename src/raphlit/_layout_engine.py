@@ -0,0 +1,321 @@
+"""
+Layout engines computing node positions for InteractiveGraph.
+Engines work on plain arrays so they can run on the script thread, in a thread pool or in a process pool.
+"""
+
+from typing import (
+    Callable,
+    Dict,
+    Hashable,
+    List,
+    Literal,
+    Optional,
+    Tuple,
+)
+from abc import ABC, abstractmethod
+from concurrent.futures import Executor, ThreadPoolExecutor, ProcessPoolExecutor, wait
+
+import multiprocessing
+import threading
+
+import numpy as np
+import networkx as nx
+import streamlit as st
+
+ExecutorKind = Literal["inline", "thread", "process"]
+
+_executors: Dict[str, Executor] = {}  # Shared by every session of the server
+_executors_lock = threading.Lock()
+
+def _get_executor(kind: ExecutorKind) -> Executor:
+    with _executors_lock:
+        if kind not in _executors:
+            if kind == "thread":
+                _executors[kind] = ThreadPoolExecutor(thread_name_prefix="raphlit_layout")
+            elif kind == "process":  # Streamlit runs threads, forking is not safe
+                _executors[kind] = ProcessPoolExecutor(mp_context=multiprocessing.get_context("spawn"))
+            else:
+                raise ValueError(f"Unknown layout executor {kind}")
+        return _executors[kind]
+
+
+
+def partition_cells(pos: np.ndarray, splits: int) -> np.ndarray:
+    """
+    Assign each position to one of splits ** dim cells holding the same number of positions, like the leaves of a k-d tree :
+    positions are split in equal slabs along the first axis, each slab along the second axis, and so on.
+    Returns the cell index of each position.
+    """
+    n, dim = pos.shape
+    cells = np.zeros(n, dtype=np.intp)
+    for axis in range(dim):
+        order = np.lexsort((pos[:, axis], cells))
+        sizes = np.bincount(cells)
+        starts = np.cumsum(sizes) - sizes
+        sorted_cells = cells[order]
+        rank = np.arange(n) - starts[sorted_cells]
+        cells[order] = sorted_cells * splits + rank * splits // sizes[sorted_cells]
+    return cells
+
+
+
+def seed_positions(positions: np.ndarray, placed: np.ndarray, offsets: np.ndarray, neighbours: np.ndarray, rng: Optional[np.random.Generator] = None):
+    """
+    Place the nodes that are not placed yet next to their placed neighbours, in place, so a layout does not need to run for them.
+    Nodes without placed neighbours start at random in the [-1, 1] box. Same seeding as LayoutCache warm starts.
+
+    Parameters:
+        positions (np.ndarray):
+            The (n, dim) positions, only read for placed nodes.
+        placed (np.ndarray):
+            Boolean mask of the placed nodes, updated as nodes are placed.
+        offsets, neighbours (np.ndarray):
+            Compressed adjacency of the nodes, see GraphItems.adjacency().
+    """
+    rng = rng or np.random.default_rng()
+    dim = positions.shape[1]
+    for i in np.flatnonzero(~placed).tolist():
+        around = neighbours[offsets[i]:offsets[i + 1]]
+        around = around[placed[around]]
+        if len(around):
+            positions[i] = positions[around].mean(axis=0) + rng.uniform(-0.05, 0.05, dim)
+        else:
+            positions[i] = rng.uniform(-1, 1, dim)
+        placed[i] = True
+
+
+
+# ====================================================================== ENGINES
+
+
+
+class LayoutEngine(ABC):
+    """
+    Computes node positions from a node count and an edge array.
+    Can be passed as the layout of InteractiveGraph.compute_figure() or called on a networkx graph directly.
+    """
+
+    def __init__(self, dim: int = 3, executor: ExecutorKind = "inline", message: str = "Computing layout..."):
+        """
+        Parameters:
+            dim (int):
+                Dimension of the positions.
+            executor ("inline", "thread", "process"):
+                Where the layout runs. "thread" and "process" use a pool shared by all sessions
+                and display a progress bar (thread) or a spinner (process) while the script waits.
+            message (str):
+                Text displayed while waiting for the layout.
+        """
+        self.dim = dim
+        self.executor = executor
+        self.message = message
+
+    @abstractmethod
+    def compute(
+            self,
+            node_count: int,
+            edges: np.ndarray,
+            initial: Optional[np.ndarray] = None,
+            fixed: Optional[np.ndarray] = None,
+            progress: Optional[Callable[[float], None]] = None,
+        ) -> np.ndarray:
+        """
+        Compute the positions of the nodes.
+
+        Parameters:
+            node_count (int):
+                Number of nodes, nodes are referred to by their index.
+            edges (np.ndarray):
+                An (edge_count, 2) integer array of node indices.
+            initial (np.ndarray, None):
+                A (node_count, dim) array of starting positions.
+            fixed (np.ndarray, None):
+                A boolean mask of the nodes that must keep their initial position.
+            progress (Callable[[float], None], None):
+                Called with the completed fraction, from whichever thread runs the layout.
+
+        Returns:
+            A (node_count, dim) float array.
+        """
+        raise NotImplementedError("Layout engines must implement compute()")
+
+    def cache_key(self) -> Hashable:
+        """Identifies the layouts this engine produces, layouts are cached per engine."""
+        return (type(self).__name__, self.dim)
+
+    def run(self, node_count: int, edges: np.ndarray, initial: Optional[np.ndarray] = None, fixed: Optional[np.ndarray] = None) -> np.ndarray:
+        """Compute the positions on the configured executor, displaying progress while waiting."""
+        if self.executor == "inline":
+            return self.compute(node_count, edges, initial, fixed)
+
+        if self.executor == "thread":
+            done = [0.0]
+            future = _get_executor("thread").submit(self.compute, node_count, edges, initial, fixed, lambda fraction: done.__setitem__(0, fraction))
+            placeholder = st.empty()
+            bar = placeholder.progress(0.0, text=self.message)
+            while not wait([future], timeout=0.1).done:
+                bar.progress(min(1.0, done[0]), text=self.message)
+            placeholder.empty()
+            return future.result()
+
+        future = _get_executor(self.executor).submit(self.compute, node_count, edges, initial, fixed)
+        with st.spinner(self.message):
+            return future.result()
+
+    def __call__(self, digraph: nx.DiGraph) -> List[Tuple[float, ...]]:
+        nodes = list(digraph.nodes)
+        index = {node: i for i, node in enumerate(nodes)}
+        edges = np.array([(index[u], index[v]) for u, v in digraph.edges], dtype=np.intp).reshape(-1, 2)
+        return [tuple(position) for position in self.run(len(nodes), edges).tolist()]
+
+
+
+class SpringLayout(LayoutEngine):
+    """
+    networkx' spring_layout. Exact but O(n^2) per iteration, suited to graphs up to a few thousand nodes.
+    """
+
+    def __init__(self, dim: int = 3, iterations: int = 50, seed: Optional[int] = None, executor: ExecutorKind = "inline", message: str = "Computing layout..."):
+        super().__init__(dim=dim, executor=executor, message=message)
+        self.iterations = iterations
+        self.seed = seed
+
+    def compute(self, node_count, edges, initial=None, fixed=None, progress=None):
+        graph = nx.Graph()
+        graph.add_nodes_from(range(node_count))
+        graph.add_edges_from(edges.tolist())
+
+        pos = {i: position for i, position in enumerate(initial)} if initial is not None else None
+        fixed = np.flatnonzero(fixed).tolist() if fixed is not None and fixed.any() else None
+
+        positions = nx.spring_layout(graph, dim=self.dim, pos=pos, fixed=fixed, iterations=self.iterations, seed=self.seed)
+        return np.array([positions[i] for i in range(node_count)], dtype=float).reshape(-1, self.dim)
+
+    def cache_key(self) -> Hashable:
+        return (type(self).__name__, self.dim, self.iterations)
+
+
+
+class ForceDirectedLayout(LayoutEngine):
+    """
+    Fruchterman-Reingold in NumPy, with a Barnes-Hut style approximation of the repulsion.
+    Nodes are binned in a grid of about sqrt(n) cells. Repulsion between nodes of the same cell is exact,
+    repulsion from other cells uses their centre of mass. Attraction runs over the sparse edge list.
+    Costs O(n^1.5 + edges) per iteration instead of O(n^2), so 50k node graphs lay out in well under a minute.
+    """
+
+    def __init__(
+            self,
+            dim: int = 3,
+            iterations: int = 50,
+            seed: Optional[int] = None,
+            executor: ExecutorKind = "inline",
+            message: str = "Computing layout...",
+            chunk_size: int = 2**20,
+        ):
+        """
+        Parameters:
+            iterations (int):
+                Number of force iterations.
+            seed (int, None):
+                Seed of the random initial positions.
+            chunk_size (int):
+                Maximum number of node pairs evaluated at once, bounds the memory used by the repulsion.
+        """
+        super().__init__(dim=dim, executor=executor, message=message)
+        self.iterations = iterations
+        self.seed = seed
+        self.chunk_size = chunk_size
+
+    def compute(self, node_count, edges, initial=None, fixed=None, progress=None):
+        n, dim = node_count, self.dim
+        if n == 0:
+            return np.zeros((0, dim))
+
+        rng = np.random.default_rng(self.seed)
+        pos = rng.uniform(-1, 1, (n, dim)) if initial is None else np.array(initial, dtype=float)
+        movable = np.ones(n, dtype=bool) if fixed is None else ~np.asarray(fixed, dtype=bool)
+        edges = np.asarray(edges, dtype=np.intp).reshape(-1, 2)
+        edges = edges[edges[:, 0] != edges[:, 1]]  # Self loops carry no force
+
+        k = 2.0 / n ** (1 / dim)  # Optimal distance for n nodes in the [-1, 1] box
+        temperature = 0.2
+        cooling = temperature / (self.iterations + 1)
+
+        for iteration in range(self.iterations):
+            disp = self._repulsion(pos, k)
+
+            if len(edges):
+                delta = pos[edges[:, 0]] - pos[edges[:, 1]]
+                distance = np.maximum(np.linalg.norm(delta, axis=1), 0.01)
+                force = delta * (distance / k)[:, None]
+                for d in range(dim):
+                    disp[:, d] -= np.bincount(edges[:, 0], force[:, d], minlength=n)
+                    disp[:, d] += np.bincount(edges[:, 1], force[:, d], minlength=n)
+
+            length = np.maximum(np.linalg.norm(disp, axis=1), 0.01)
+            step = disp * (np.minimum(length, temperature) / length)[:, None]
+            pos[movable] += step[movable]
+            temperature -= cooling
+
+            if progress:
+                progress((iteration + 1) / self.iterations)
+
+        if fixed is None or not np.any(fixed):  # Same normalization as spring_layout
+            pos -= pos.mean(axis=0)
+            scale = np.abs(pos).max()
+            if scale > 0:
+                pos /= scale
+        return pos
+
+    def _repulsion(self, pos: np.ndarray, k: float) -> np.ndarray:
+        n, dim = pos.shape
+        cell_of_node, cell_count = self._cells(pos)
+        counts = np.bincount(cell_of_node, minlength=cell_count).astype(float)
+        occupied = counts > 0
+        centers = np.stack([np.bincount(cell_of_node, pos[:, d], minlength=cell_count) for d in range(dim)], axis=1)
+        centers[occupied] /= counts[occupied, None]
+
+        disp = np.zeros_like(pos)
+
+        # Far field: every node against every other cell's centre of mass
+        rows = max(1, self.chunk_size // cell_count)
+        for start in range(0, n, rows):
+            stop = min(n, start + rows)
+            weight = counts[None, :] / self._squared_distances(pos[start:stop], centers)
+            weight[np.arange(stop - start), cell_of_node[start:stop]] = 0.0  # Own cell is handled exactly
+            disp[start:stop] = self._pull(pos[start:stop], centers, weight)
+
+        # Near field: exact repulsion inside each cell
+        order = np.argsort(cell_of_node, kind="stable")
+        for members in np.split(order, np.cumsum(counts.astype(np.intp))[:-1]):
+            if len(members) < 2:
+                continue
+            sources = pos[members]
+            rows = max(1, self.chunk_size // len(members))
+            for start in range(0, len(members), rows):
+                targets = members[start:start + rows]
+                weight = 1.0 / self._squared_distances(pos[targets], sources)
+                weight[np.arange(len(targets)), np.arange(start, start + len(targets))] = 0.0  # Not against itself
+                disp[targets] += self._pull(pos[targets], sources, weight)
+
+        return disp * k * k
+
+    def _cells(self, pos: np.ndarray) -> Tuple[np.ndarray, int]:
+        """Bin nodes in about sqrt(n) cells of equal size, which keeps the exact near field cheap even when nodes are clustered."""
+        n, dim = pos.shape
+        splits = max(1, int(round(n ** (1 / (2 * dim)))))
+        return partition_cells(pos, splits), splits ** dim
+
+    @staticmethod
+    def _squared_distances(targets: np.ndarray, sources: np.ndarray) -> np.ndarray:
+        distances = (targets ** 2).sum(axis=1)[:, None] + (sources ** 2).sum(axis=1)[None, :] - 2 * targets @ sources.T
+        return np.maximum(distances, 1e-4)
+
+    @staticmethod
+    def _pull(targets: np.ndarray, sources: np.ndarray, weight: np.ndarray) -> np.ndarray:
+        """sum_j weight_ij * (target_i - source_j), without materializing the pairwise deltas."""
+        return targets * weight.sum(axis=1)[:, None] - weight @ sources
+
+    def cache_key(self) -> Hashable:
+        return (type(self).__name__, self.dim, self.iterations)
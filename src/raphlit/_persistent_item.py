@@ -1,9 +1,14 @@
-from typing import Optional, Type, TypeVar, cast
+from typing import Callable, ContextManager, Optional, Type, TypeVar, cast
 from abc import abstractmethod, ABC
 
 import streamlit as st
 
+from ._shared_cache import shared_cache
+from ._spill_store import spill_store, _SpillHandle
+from ._profiling import profiler
+
 T = TypeVar('T', bound='PersistentItem')
+V = TypeVar('V')
 
 class PersistentItem(ABC):
     """
@@ -23,8 +28,10 @@ class PersistentItem(ABC):
 
     @classmethod
     def get_from_session(cls: Type[T], key: str) -> T:
-        """Retrieve an instance of this class from the session state."""
+        """Retrieve an instance of this class from the session state, loading it back from disk if it was spilled."""
         item = st.session_state.get(key)
+        if isinstance(item, _SpillHandle):
+            item = item.get()
         if cls.__name__ != type(item).__name__:
             raise ValueError(f"Expected {cls.__name__}, got {type(item).__name__}")
         return item
@@ -38,9 +45,12 @@ class PersistentItem(ABC):
 
     @classmethod
     def set_session(cls: Type[T], key: str, value: T) -> None:
-        """Sets the value of the instance at {key} in the session state to the provided one"""
+        """
+        Sets the value of the instance at {key} in the session state to the provided one.
+        NOTE : Under a memory budget (see enable_spill_to_disk), the session state holds a handle instead, use get_from_session() to read it.
+        """
         setattr(value, '_key', key)  # Store the key as an attribute of the persistant item
-        st.session_state[key] = value
+        st.session_state[key] = spill_store.wrap(value)
 
     @classmethod
     def persist(cls: Type[T], key: str, initial_value: Optional[T] = None, rebuild_on_reload: bool = False, **kwargs) -> None:
@@ -53,3 +63,47 @@ class PersistentItem(ABC):
                 cls.set_session(key=key, value=cls(**kwargs))  # Use default constructor
             else:
                 cls.set_session(key=key, value=initial_value)
+
+    def shared(self, name: str, factory: Callable[[], V]) -> V:
+        """
+        Get a value shared by every session of the server, built once with factory().
+        The value is held by this item until it is garbage collected (when its session ends),
+        and evicted from the process-wide cache some time after no session holds it anymore.
+        Store immutable data this way, and keep the per-session state on the item itself.
+        """
+        return shared_cache.attach(self, (type(self).__module__, type(self).__qualname__, name), factory)
+
+    def invalidate_shared(self, name: str):
+        """Rebuild the shared value at name the next time any session asks for it."""
+        shared_cache.invalidate((type(self).__module__, type(self).__qualname__, name))
+
+    def run_fragment(self, method: str, *args) -> None:
+        """
+        Call the method named method in a st.fragment.
+        Fragment reruns call it on the item found in the session state at self.key rather than on self,
+        which may have been spilled to disk and loaded back as another object in the meantime.
+        """
+        key, cls = self.key, type(self)
+
+        def fragment():
+            getattr(cls.get_from_session(key), method)(*args)
+
+        fragment.__qualname__ = f"{cls.__qualname__}.{method}[{key}]"  # Streamlit tells fragments apart by qualified name
+        st.fragment(fragment)()
+
+    def busy(self) -> bool:
+        """
+        Whether background work (a worker thread, a pending timer) is still using this item.
+        Busy items are never spilled to disk under a memory budget, see enable_spill_to_disk.
+        """
+        return False
+
+    def profile(self, phase: str) -> ContextManager[None]:
+        """
+        Time the enclosed code as a phase of this item's rerun, when profiling is enabled (see enable_profiling).
+
+        Example :
+            with self.profile("build_nodes"):
+                self.graph_items = self.build_nodes()
+        """
+        return profiler.phase(getattr(self, '_key', type(self).__name__), phase)
@@ -0,0 +1,268 @@
+"""
+Per rerun profiling of the display phases of persistent items.
+Phases are timed (and optionally their allocations measured) when profiling is enabled, and sent to pluggable sinks.
+"""
+
+from typing import (
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+)
+from pydantic import BaseModel
+from abc import ABC, abstractmethod
+from collections import deque
+from contextlib import contextmanager
+
+import logging
+import os
+import threading
+import time
+import tracemalloc
+
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+logger = logging.getLogger(__name__)
+
+_SESSION_KEY = "raphlit_profile"
+
+
+
+class PhaseRecord(BaseModel):
+    """How long a phase of an item took during a rerun."""
+    item: str  # Key of the persistent item
+    phase: str
+    seconds: float
+    allocated_bytes: Optional[int] = None  # Net allocations, when tracking them
+    session: str = ""
+    run: int = 0  # Script run number within the session, fragment reruns included
+    depth: int = 0  # Number of phases enclosing this one on its thread, 0 for top level phases
+    timestamp: float = 0.0
+
+
+
+# ====================================================================== SINKS
+
+
+
+class ProfileSink(ABC):
+    """Receives the phase records as they are made, from the script thread of any session."""
+
+    @abstractmethod
+    def emit(self, record: PhaseRecord):
+        raise NotImplementedError("Profile sinks must implement emit()")
+
+
+
+class LogSink(ProfileSink):
+    """Logs each record."""
+
+    def __init__(self, logger: logging.Logger = logger, level: int = logging.INFO):
+        self.logger = logger
+        self.level = level
+
+    def emit(self, record: PhaseRecord):
+        allocated = f", {record.allocated_bytes} B" if record.allocated_bytes is not None else ""
+        self.logger.log(self.level, f"{record.item}.{record.phase} : {record.seconds * 1000:.1f} ms{allocated} (session {record.session}, run {record.run})")
+
+
+
+class RingBufferSink(ProfileSink):
+    """Keeps the last size records, of all sessions together, in memory."""
+
+    def __init__(self, size: int = 1000):
+        self.records: deque[PhaseRecord] = deque(maxlen=size)
+
+    def emit(self, record: PhaseRecord):
+        self.records.append(record)  # deque appends are thread safe
+
+
+
+class PrometheusFileSink(ProfileSink):
+    """
+    Aggregates the records per item and phase, and writes them to a file in Prometheus' text format,
+    for a node exporter textfile collector to pick up. The file is rewritten at most every interval seconds.
+    """
+
+    def __init__(self, path: str, prefix: str = "raphlit", interval: float = 10.0):
+        self.path = path
+        self.prefix = prefix
+        self.interval = interval
+        self._totals: Dict[Tuple[str, str], List[float]] = {}  # (item, phase) -> [count, seconds, allocated bytes]
+        self._written = 0.0
+        self._lock = threading.RLock()
+
+    def emit(self, record: PhaseRecord):
+        with self._lock:
+            totals = self._totals.setdefault((record.item, record.phase), [0, 0.0, 0.0])
+            totals[0] += 1
+            totals[1] += record.seconds
+            totals[2] += record.allocated_bytes or 0
+            if time.monotonic() - self._written >= self.interval:
+                self.write()
+
+    def write(self):
+        """Write the current totals, atomically so the collector never reads a partial file."""
+        with self._lock:
+            lines = [
+                f"# HELP {self.prefix}_phase_seconds Wall time spent in each display phase.",
+                f"# TYPE {self.prefix}_phase_seconds summary",
+            ]
+            for (item, phase), (count, seconds, _) in sorted(self._totals.items()):
+                labels = f'item="{_escape(item)}",phase="{_escape(phase)}"'
+                lines.append(f"{self.prefix}_phase_seconds_sum{{{labels}}} {seconds}")
+                lines.append(f"{self.prefix}_phase_seconds_count{{{labels}}} {int(count)}")
+            lines.append(f"# HELP {self.prefix}_phase_allocated_bytes_total Net bytes allocated in each display phase, when tracked.")
+            lines.append(f"# TYPE {self.prefix}_phase_allocated_bytes_total counter")
+            for (item, phase), (_, _, allocated) in sorted(self._totals.items()):
+                lines.append(f'{self.prefix}_phase_allocated_bytes_total{{item="{_escape(item)}",phase="{_escape(phase)}"}} {int(allocated)}')
+
+            temporary = f"{self.path}.{os.getpid()}.tmp"
+            with open(temporary, "w") as file:
+                file.write("\n".join(lines) + "\n")
+            os.replace(temporary, self.path)
+            self._written = time.monotonic()
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+
+# ====================================================================== PROFILER
+
+
+
+class Profiler:
+    """
+    Times the phases of the display methods. Disabled by default, phases then cost next to nothing.
+    Records of the running script are also kept in its session state, for the debug panel.
+    Each script run of a session (fragment reruns included) gets a new run number.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.track_allocations = False
+        self.sinks: List[ProfileSink] = []
+        self._local = threading.local()  # depth : phases open on the thread
+
+    def enable(self, *sinks: ProfileSink, track_allocations: bool = False):
+        """
+        Parameters:
+            sinks (ProfileSink):
+                Where the records are sent, in addition to the session state.
+            track_allocations (bool):
+                Measure the net allocations of each phase with tracemalloc.
+                This slows everything down noticeably, and allocations of concurrent sessions are counted too.
+        """
+        self.enabled = True
+        self.sinks = list(sinks)
+        self.track_allocations = track_allocations
+        if track_allocations and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def disable(self):
+        self.enabled = False
+
+    @contextmanager
+    def phase(self, item: str, phase: str) -> Iterator[None]:
+        """Time the enclosed code as the phase of item."""
+        if not self.enabled:
+            yield
+            return
+
+        allocations = self.track_allocations and tracemalloc.is_tracing()
+        before = tracemalloc.get_traced_memory()[0] if allocations else 0
+        depth = getattr(self._local, "depth", 0)
+        self._local.depth = depth + 1
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            self._local.depth = depth
+            state = self._session_profile()
+            ctx = get_script_run_ctx()
+            record = PhaseRecord(
+                item=item,
+                phase=phase,
+                seconds=seconds,
+                allocated_bytes=tracemalloc.get_traced_memory()[0] - before if allocations else None,
+                session=ctx.session_id if ctx is not None else "",
+                run=state["run"],
+                depth=depth,
+                timestamp=time.time(),
+            )
+            state["records"].append(record)  # Bounded, in case display_profile() is never called
+            for sink in self.sinks:
+                try:
+                    sink.emit(record)
+                except Exception:
+                    logger.exception(f"Profile sink {type(sink).__name__} failed")
+
+    def run_records(self) -> List[PhaseRecord]:
+        """The records of the current run of this session."""
+        return list(self._session_profile()["records"])
+
+    def end_run(self) -> List[PhaseRecord]:
+        """
+        Close the current run of this session early, following records belong to the next one. Returns the closed run's records.
+        Runs are closed on their own when the script runs again.
+        """
+        state = self._session_profile()
+        records = list(state["records"])
+        self._new_run(state)
+        return records
+
+    @classmethod
+    def _session_profile(cls) -> Dict:
+        if _SESSION_KEY not in st.session_state:
+            st.session_state[_SESSION_KEY] = {"run": 0, "records": deque(maxlen=1000), "marker": None}
+        state = st.session_state[_SESSION_KEY]
+        # NOTE : Streamlit has no public run id, but gives the context a new cursors dict at the start of every script run.
+        # The previous one is kept in the state, so its id() cannot be reused by the next one.
+        ctx = get_script_run_ctx()
+        marker = getattr(ctx, "cursors", None)
+        if marker is not None and marker is not state["marker"]:
+            if state["marker"] is not None or state["records"]:
+                cls._new_run(state)
+            state["marker"] = marker
+        return state
+
+    @staticmethod
+    def _new_run(state: Dict):
+        state["records"] = deque(maxlen=1000)
+        state["run"] += 1
+
+
+profiler = Profiler()  # Shared by every session of the server
+
+
+def enable_profiling(*sinks: ProfileSink, track_allocations: bool = False):
+    """Start profiling the display phases of every session. See Profiler.enable()."""
+    profiler.enable(*sinks, track_allocations=track_allocations)
+
+
+def display_profile(expanded: bool = False):
+    """
+    Debug panel listing the phases recorded during this run, nested phases indented under the ones enclosing them.
+    Call it at the end of the script, so every phase of the run is listed.
+    """
+    if not profiler.enabled:
+        return
+    records = sorted(profiler.run_records(), key=lambda record: record.timestamp - record.seconds)  # By start, parents before their phases
+    total = sum(record.seconds for record in records if record.depth == 0)  # Nested phases are part of their parent's time
+    with st.expander(f"Profile : {len(records)} phases, {total * 1000:.0f} ms", expanded=expanded):
+        st.dataframe(
+            [
+                {
+                    "item": record.item,
+                    "phase": "  " * record.depth + record.phase,
+                    "ms": round(record.seconds * 1000, 2),
+                    "allocated KiB": round(record.allocated_bytes / 1024, 1) if record.allocated_bytes is not None else None,
+                }
+                for record in records
+            ],
+        )
@@ -0,0 +1,161 @@
+"""
+Runs the on_select callbacks of a graph on a thread pool, so slow callbacks do not delay the click's rerun.
+Each callback is debounced on its own : rapid clicks only run it for the last selection.
+The app reruns once the callbacks of the last selection completed, to show their results.
+"""
+
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    List,
+    Optional,
+)
+from concurrent.futures import ThreadPoolExecutor
+
+import logging
+import threading
+
+from .rerun_flag import _session_rerun
+
+logger = logging.getLogger(__name__)
+
+_executor: Optional[ThreadPoolExecutor] = None  # Shared by every session of the server
+_executor_lock = threading.Lock()
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(thread_name_prefix="raphlit_select")
+        return _executor
+
+
+def _name(callback: Callable) -> str:
+    return getattr(callback, "__qualname__", None) or repr(callback)
+
+
+
+class _CallbackState:
+    """Where a callback stands : the latest selection it was dispatched for, its pending timer, and its latest result."""
+
+    def __init__(self):
+        self.generation = 0  # Bumped by every dispatch, work of older generations is dropped
+        self.timer: Optional[threading.Timer] = None
+        self.done_generation = -1
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+
+class SelectDispatcher:
+    """
+    Runs callbacks in the background, for InteractiveGraph(dispatcher=...).
+    A callback starts debounce seconds after its last dispatch, on a thread pool shared by every session.
+    Runs of a selection that was replaced in the meantime are skipped if they have not started, and their results dropped otherwise.
+    Results of the latest selection are read from the next reruns with result(). Once every callback of the latest selection
+    completed, the session that dispatched it reruns (with rerun=True), so the results show without waiting for the user.
+
+    Callbacks run outside of the script thread : they must not call Streamlit, only return what the script should display.
+    """
+
+    def __init__(self, debounce: float = 0.2, rerun: bool = True):
+        """
+        Parameters:
+            debounce (float):
+                Seconds a callback waits for another selection before running.
+            rerun (bool):
+                Whether to rerun the app once the callbacks of the latest selection completed.
+        """
+        self.debounce = debounce
+        self.rerun = rerun
+        self._states: Dict[Callable, _CallbackState] = {}  # By callback, bound methods compare equal across accesses
+        self._lock = threading.Lock()
+        self._rerun_session: Callable[[], None] = lambda: None  # Reruns the session of the latest dispatch
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_lock"], state["_rerun_session"]
+        with self._lock:  # Pending runs stay with the live object, only finished results are kept
+            state["_states"] = {callback: self._finished_state(callback_state) for callback, callback_state in self._states.items()}
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+        self._rerun_session = lambda: None
+
+    @staticmethod
+    def _finished_state(state: _CallbackState) -> _CallbackState:
+        copy = _CallbackState()
+        copy.generation = copy.done_generation = state.done_generation
+        copy.result, copy.error = state.result, state.error
+        return copy
+
+    def dispatch(self, callbacks: List[Callable[[Any, str], Any]], selected_values: List[Any], event: str):
+        """Schedule every callback for that selection, replacing the runs scheduled for previous selections."""
+        selected_values = list(selected_values)  # Read later by the workers
+        with self._lock:
+            if self.rerun and callbacks:
+                self._rerun_session = _session_rerun()  # On the script thread, which knows its session
+            for callback in callbacks:
+                state = self._states.setdefault(callback, _CallbackState())
+                state.generation += 1
+                if state.timer is not None:
+                    state.timer.cancel()  # Debounced, never started
+                state.timer = threading.Timer(self.debounce, self._submit, (callback, state, state.generation, selected_values, event))
+                state.timer.daemon = True
+                state.timer.start()
+
+    def _submit(self, callback: Callable, state: _CallbackState, generation: int, selected_values: List[Any], event: str):
+        if state.generation == generation:
+            _get_executor().submit(self._run, callback, state, generation, selected_values, event)
+
+    def _run(self, callback: Callable, state: _CallbackState, generation: int, selected_values: List[Any], event: str):
+        if state.generation != generation:
+            return  # Another selection came while waiting for a worker
+        result, error = None, None
+        try:
+            result = callback(selected_values, event)
+        except Exception as e:
+            logger.exception(f"on_select callback {_name(callback)} failed")
+            error = e
+        with self._lock:
+            if state.generation != generation:  # Another selection came meanwhile
+                return
+            state.done_generation, state.result, state.error = generation, result, error
+            state.timer = None
+            completed = all(state.done_generation == state.generation for state in self._states.values())
+            rerun_session = self._rerun_session
+        if self.rerun and completed:
+            rerun_session()
+
+    def pending(self, callback: Optional[Callable] = None) -> bool:
+        """Whether the latest selection's run of that callback (of any callback by default) is still to complete."""
+        with self._lock:
+            states = [self._states.get(callback)] if callback is not None else list(self._states.values())
+            return any(state is not None and state.done_generation != state.generation for state in states)
+
+    def result(self, callback: Callable, default: Any = None) -> Any:
+        """
+        What the callback returned for the latest selection, or default while it is pending.
+        Raises the callback's exception if it failed.
+        """
+        with self._lock:
+            state = self._states.get(callback)
+            if state is None or state.done_generation != state.generation:
+                return default
+            if state.error is not None:
+                raise state.error
+            return state.result
+
+    def cancel(self):
+        """Drop every pending run. Runs already started complete, their results are dropped."""
+        with self._lock:
+            for state in self._states.values():
+                state.generation += 1
+                if state.timer is not None:
+                    state.timer.cancel()
+                    state.timer = None
+                state.done_generation = state.generation  # Nothing pending anymore
+                state.result, state.error = None, None
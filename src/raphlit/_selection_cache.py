@@ -0,0 +1,71 @@
+"""
+A bounded cache of what a graph built for each selection, so revisiting a recent selection skips on_update().
+"""
+
+from typing import (
+    Any,
+    Callable,
+    Hashable,
+    Optional,
+    Tuple,
+)
+from collections import OrderedDict
+
+import time
+
+
+
+class SelectionCache:
+    """
+    LRU cache with a time to live, keyed by selection and version token. See InteractiveGraph(selection_cache=...).
+    Entries hold live objects (graph items, figure), they are only valid as long as nobody modifies them in place.
+    The cache is not pickled : an item spilled to disk or copied comes back with an empty cache.
+    """
+
+    def __init__(self, max_size: int = 16, ttl: Optional[float] = 300.0):
+        """
+        Parameters:
+            max_size (int):
+                Maximum number of entries, the least recently used one is evicted first.
+            ttl (float, None):
+                Seconds an entry stays valid after it was stored, None keeps entries until they are evicted.
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[Hashable, Tuple[float, Any]] = OrderedDict()  # key -> (stored at, value)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_entries"] = OrderedDict()
+        return state
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is not None and self.ttl is not None and time.monotonic() - entry[0] > self.ttl:
+            del self._entries[key]
+            entry = None
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def put(self, key: Hashable, value: Any):
+        self._entries[key] = (time.monotonic(), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def discard(self, predicate: Callable[[Hashable, Any], bool]):
+        """Drop the entries for which predicate(key, value) is true."""
+        for key in [key for key, (_, value) in self._entries.items() if predicate(key, value)]:
+            del self._entries[key]
+
+    def clear(self):
+        self._entries.clear()
@@ -0,0 +1,118 @@
+"""
+A process-wide cache for values shared by every session of the Streamlit server.
+Values are reference counted by the items holding them, and evicted once no session has used them for a while.
+"""
+
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Hashable,
+    Tuple,
+    TypeVar,
+)
+from collections import OrderedDict
+
+import threading
+import time
+import weakref
+
+V = TypeVar('V')
+
+
+
+class _Entry:
+    def __init__(self, value: Any):
+        self.value = value
+        self.refs = 0
+        self.last_used = time.monotonic()
+
+
+
+class SharedCache:
+    """
+    Values shared across sessions, keyed by any hashable.
+    Each holder (typically a PersistentItem in some session state) counts as one reference until it is garbage collected,
+    which happens when its session ends. Values nobody holds are kept for reuse, up to max_idle of them.
+    """
+
+    def __init__(self, max_idle: int = 16):
+        """
+        Parameters:
+            max_idle (int):
+                Maximum number of values held by no session that are kept, the least recently used is evicted first.
+        """
+        self.max_idle = max_idle
+        self._entries: OrderedDict[Hashable, _Entry] = OrderedDict()
+        self._holders: Dict[Tuple[int, Hashable], Tuple[_Entry, weakref.finalize]] = {}
+        self._lock = threading.RLock()
+        self._build_locks: Dict[Hashable, threading.Lock] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    def refs(self, key: Hashable) -> int:
+        """Number of holders of the current value at key."""
+        entry = self._entries.get(key)
+        return entry.refs if entry is not None else 0
+
+    def attach(self, owner: object, key: Hashable, factory: Callable[[], V]) -> V:
+        """
+        Get the value at key, building it with factory() if needed, and count owner as a holder until it is garbage collected.
+        Calling this again with the same owner is cheap, and moves the owner to the new value if the key was invalidated.
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            with self._lock:
+                build_lock = self._build_locks.setdefault(key, threading.Lock())
+            with build_lock:  # Only one session builds a missing value, the others wait for it
+                entry = self._entries.get(key)
+                if entry is None:
+                    entry = _Entry(factory())
+                    with self._lock:
+                        self._entries[key] = entry
+
+        with self._lock:
+            holder_key = (id(owner), key)
+            holder = self._holders.get(holder_key)
+            if holder is None or holder[0] is not entry:
+                if holder is not None:
+                    holder[1].detach()
+                    holder[0].refs -= 1
+                entry.refs += 1
+                self._holders[holder_key] = (entry, weakref.finalize(owner, self._release, holder_key))
+
+            entry.last_used = time.monotonic()
+            if key in self._entries:
+                self._entries.move_to_end(key)
+            self._evict()
+            return entry.value
+
+    def invalidate(self, key: Hashable):
+        """Forget the value at key. Current holders keep it until they attach again, new ones get a fresh value."""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _release(self, holder_key: Tuple[int, Hashable]):
+        with self._lock:
+            holder = self._holders.pop(holder_key, None)
+            if holder is not None:
+                holder[0].refs -= 1
+                holder[0].last_used = time.monotonic()
+                self._evict()
+
+    def _evict(self):
+        idle = [key for key, entry in self._entries.items() if entry.refs <= 0]
+        for key in idle[:max(0, len(idle) - self.max_idle)]:  # Least recently used first
+            del self._entries[key]
+            self._build_locks.pop(key, None)
+
+
+shared_cache = SharedCache()  # Shared by every session of the server
@@ -0,0 +1,210 @@
+"""
+An optional memory budget for persistent items.
+When enabled, items are stored in the session state behind a handle, and the least recently used ones
+are pickled to a local directory once the budget is exceeded. They are loaded back when next retrieved.
+"""
+
+from typing import (
+    Any,
+    Dict,
+    Optional,
+)
+from collections import OrderedDict
+
+import logging
+import os
+import pickle
+import tempfile
+import threading
+import time
+import uuid
+import weakref
+
+logger = logging.getLogger(__name__)
+
+
+
+class _SpillHandle:
+    """What the session state holds for an item under a memory budget : the item itself, or the file it was spilled to."""
+
+    def __init__(self, store: 'SpillStore', item: Any, size: int):
+        self.store = store
+        self.item = item
+        self.size = size
+        self.path: Optional[str] = None
+        self.pinned = False  # Items that cannot be pickled stay in memory
+        self.last_used = time.monotonic()
+        self._finalizer: Optional[weakref.finalize] = None
+
+    @property
+    def spilled(self) -> bool:
+        return self.item is None
+
+    def get(self) -> Any:
+        return self.store.get(self)
+
+
+
+class SpillStore:
+    """
+    Keeps the items of every session under max_bytes, spilling the least recently used ones to disk.
+    Sizes are the pickled size of the items, measured again on every get() : an item is accounted for
+    as the previous script run left it, and growing items trigger spilling on the next run.
+    Items that cannot be pickled (such as instances of classes defined in a page script) stay in memory,
+    outside of the budget, with a warning.
+    """
+
+    def __init__(self, max_bytes: Optional[int] = None, directory: Optional[str] = None, min_idle: float = 60.0):
+        """
+        Parameters:
+            max_bytes (int, None):
+                Memory budget shared by the items of every session. None disables the store,
+                items are then stored in the session state as is.
+            directory (str, None):
+                Where spilled items are written. Defaults to a new temporary directory.
+            min_idle (float):
+                Items used less than min_idle seconds ago are never spilled, even over budget,
+                so a script run still holding an item does not keep modifying a stale copy.
+                Items whose busy() is true (background work still using them) are never spilled either, however idle.
+        """
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self.min_idle = min_idle
+        self.resident_bytes = 0
+        self._handles: OrderedDict[int, weakref.ref] = OrderedDict()  # Resident handles, least recently used first
+        self._sizes: Dict[int, int] = {}  # Accounted size of the resident handles, read once the handle is gone
+        self._lock = threading.RLock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes is not None
+
+    def __len__(self) -> int:
+        return len(self._handles)
+
+    def wrap(self, item: Any) -> Any:
+        """The value to store in the session state for item : a handle when the store is enabled, the item otherwise."""
+        if not self.enabled:
+            return item
+        handle = _SpillHandle(self, item, 0)
+        with self._lock:
+            self._add(handle)
+            self._measure(handle)
+            self._evict(keep=handle)
+        return handle
+
+    def get(self, handle: _SpillHandle) -> Any:
+        """The item behind handle, loaded back from disk if it was spilled."""
+        with self._lock:
+            if handle.spilled:
+                with open(handle.path, "rb") as file:
+                    handle.item = pickle.load(file)
+                handle.size = os.path.getsize(handle.path)
+                self._remove_file(handle)
+                self._add(handle)
+                self._evict(keep=handle)
+            elif id(handle) in self._handles:
+                self._handles.move_to_end(id(handle))
+                if not handle.pinned:
+                    self._measure(handle)  # As the previous script run left it
+                    self._evict(keep=handle)
+            handle.last_used = time.monotonic()
+            return handle.item
+
+    def spill(self, handle: _SpillHandle) -> bool:
+        """Write the item behind handle to disk and release it. Returns False if it is busy or cannot be pickled."""
+        with self._lock:
+            if handle.spilled or handle.pinned or _busy(handle.item):
+                return False
+            try:
+                data = pickle.dumps(handle.item, protocol=pickle.HIGHEST_PROTOCOL)
+            except Exception as e:
+                logger.warning(f"Cannot spill {type(handle.item).__name__} to disk, keeping it in memory: {e}")
+                handle.pinned = True
+                return False
+
+            if self.directory is None:
+                self.directory = tempfile.mkdtemp(prefix="raphlit_spill_")
+            os.makedirs(self.directory, exist_ok=True)
+            handle.path = os.path.join(self.directory, uuid.uuid4().hex + ".pkl")
+            with open(handle.path, "wb") as file:
+                file.write(data)
+            handle._finalizer = weakref.finalize(handle, _remove, handle.path)  # Session ended while spilled
+
+            self._handles.pop(id(handle), None)
+            self.resident_bytes -= self._sizes.pop(id(handle), 0)
+            handle.size = len(data)
+            handle.item = None
+            return True
+
+    def _add(self, handle: _SpillHandle):
+        self._handles[id(handle)] = weakref.ref(handle, self._forget(id(handle)))
+        self._sizes[id(handle)] = handle.size
+        self.resident_bytes += handle.size
+
+    def _measure(self, handle: _SpillHandle):
+        """Account for the current pickled size of a resident item."""
+        try:
+            size = len(pickle.dumps(handle.item, protocol=pickle.HIGHEST_PROTOCOL))
+        except Exception as e:
+            logger.warning(f"Cannot pickle {type(handle.item).__name__}, it stays in memory outside of the memory budget: {e}")
+            handle.pinned = True
+            size = 0
+        self.resident_bytes += size - self._sizes[id(handle)]
+        self._sizes[id(handle)] = handle.size = size
+
+    def _forget(self, handle_id: int):
+        def callback(_):  # Session ended, its items are released with it
+            with self._lock:
+                if self._handles.pop(handle_id, None) is not None:
+                    self.resident_bytes -= self._sizes.pop(handle_id, 0)
+        return callback
+
+    def _evict(self, keep: _SpillHandle):
+        """Spill the least recently used items until the budget is met, never the ones being used."""
+        if self.max_bytes is None:
+            return
+        idle_since = time.monotonic() - self.min_idle
+        for handle_id in list(self._handles):
+            if self.resident_bytes <= self.max_bytes:
+                break
+            handle = self._handles[handle_id]()
+            if handle is None or handle is keep:
+                continue
+            if handle.last_used > idle_since:
+                break  # Every following item was used more recently
+            self.spill(handle)
+
+    def _remove_file(self, handle: _SpillHandle):
+        if handle._finalizer is not None:
+            handle._finalizer()
+            handle._finalizer = None
+        handle.path = None
+
+
+def _busy(item: Any) -> bool:
+    """Whether background work still uses the item, see PersistentItem.busy()."""
+    busy = getattr(item, "busy", None)
+    return callable(busy) and bool(busy())
+
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+spill_store = SpillStore()  # Shared by every session of the server
+
+
+def enable_spill_to_disk(max_bytes: Optional[int], directory: Optional[str] = None, min_idle: float = 60.0):
+    """
+    Bound the memory used by persistent items across all sessions, so it depends on the active users rather than the open tabs.
+    Items stored from now on are spilled to directory, least recently used first, when they exceed max_bytes,
+    and loaded back when retrieved. Pass None to disable it for items stored from now on.
+    Call this once, before any item is stored. See SpillStore for the parameters.
+    """
+    spill_store.max_bytes = max_bytes
+    spill_store.directory = directory or spill_store.directory
+    spill_store.min_idle = min_idle
@@ -8,21 +8,46 @@ from typing import (
     List, 
     Dict,
     Callable,
+    Hashable,
+    Iterable,
+    Literal,
     Optional, 
+    Sequence,
     Tuple,
 )
-from pydantic import BaseModel
+from pydantic import BaseModel, PrivateAttr, model_serializer, model_validator
 from abc import abstractmethod
 
 import streamlit as st
 
 from ._persistent_item import PersistentItem
-from .rerun_flag import set_rerun_flag
+from ._layout_cache import LayoutCache
+from ._layout_engine import LayoutEngine, SpringLayout, partition_cells, seed_positions
+from .layout_artifact import LayoutArtifact, _from_json_id
+from ._select_dispatcher import SelectDispatcher
+from ._selection_cache import SelectionCache
+from .rerun_flag import RerunScope, set_rerun_flag, rerun_if_flag
 from streamlit_plotly_events import plotly_events
 
-import random
+from array import array
+
+import bisect
+import functools
+import itertools
+import re
+import threading
+import time
+
+import numpy as np
 import networkx as nx
 import plotly.graph_objects as go
+from plotly.basedatatypes import BasePlotlyType
+from plotly.io.json import to_json_plotly
+
+try:
+    import orjson
+except ImportError:  # Optional, pip install raphlit[fast]
+    orjson = None
 
 
 
@@ -52,14 +77,287 @@ class Edge(BaseModel):
     start: int
     end: int
 
-class GraphItems(BaseModel):
-    """Stores items for the graph."""
-    nodes: List[Node] = []
-    edges: List[Edge] = []
+class GraphItemsDiff(BaseModel):
+    """
+    What changed from one GraphItems to another, see GraphItems.diff().
+    Nodes are referred to by external id, edges by their (start, end) external ids.
+    """
+    added_nodes: List[Any] = []
+    removed_nodes: List[Any] = []
+    restyled_nodes: List[Any] = []  # Config, label or hover changed
+    added_edges: List[Tuple[Any, Any]] = []
+    removed_edges: List[Tuple[Any, Any]] = []
+    restyled_edges: List[Tuple[Any, Any]] = []  # Config changed
+
+    @property
+    def topology_changed(self) -> bool:
+        return bool(self.added_nodes or self.removed_nodes or self.added_edges or self.removed_edges)
+
+    @property
+    def empty(self) -> bool:
+        return not (self.topology_changed or self.restyled_nodes or self.restyled_edges)
+
+class _NodeSequence(Sequence[Node]):
+    """Read-only view of the nodes of a GraphItems, Node models are built on access."""
+    def __init__(self, items: 'GraphItems'):
+        self._items = items
+
+    def __len__(self) -> int:
+        return len(self._items.external_ids)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self._items.get_node(j) for j in range(len(self))[i]]
+        return self._items.get_node(i)
+
+class _EdgeSequence(Sequence[Edge]):
+    """Read-only view of the edges of a GraphItems, Edge models are built on access."""
+    def __init__(self, items: 'GraphItems'):
+        self._items = items
+
+    def __len__(self) -> int:
+        return len(self._items._edge_starts)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self._items.get_edge(j) for j in range(len(self))[i]]
+        return self._items.get_edge(i)
+
+_SEARCH_INDEXES_KEPT = 4  # Recent search indexes, shared by every session of the server
+_search_indexes: List['_SearchIndex'] = []  # Least recently used first
+_search_indexes_lock = threading.Lock()
+
+def _unhashable(error: TypeError) -> TypeError:
+    return TypeError(f"External ids must be hashable, such as str, int or tuple ({error})")
+
+class _SearchIndex:
+    """
+    Case insensitive search over the labels, hovers and external ids of some graph items, by word.
+    The distinct words are sorted, and the nodes holding each word stored word after word :
+    exact words and word prefixes are found by bisection, substrings by scanning the distinct words only.
+    Queries of several words match consecutive words of one field, checked on the nodes holding every word.
+    Recently built indexes are kept and reused by graph items holding the same texts, see of().
+    """
+    _FIELD = "\x00"  # Word between the fields of a node, stripped from queries so matches never span two fields
+
+    def __init__(self, labels: List[str], hovers: List[str], external_ids: List[Any]):
+        self.labels, self.hovers, self.external_ids = list(labels), list(hovers), list(external_ids)  # Copies, the columns change in place
+        node_words = list(map(self._words, self.labels, self.hovers, self.external_ids))
+        counts = np.fromiter(map(len, node_words), dtype=np.intp, count=len(node_words))
+        all_words = list(itertools.chain.from_iterable(node_words))
+
+        self.words: List[str] = sorted(set(all_words))
+        codes = dict(zip(self.words, range(len(self.words))))
+        word_codes = np.fromiter(map(codes.__getitem__, all_words), dtype=np.intp, count=len(all_words))
+        order = np.argsort(word_codes, kind="stable")  # Nodes sharing a word stay in local id order
+        self.postings = np.repeat(np.arange(len(node_words)), counts)[order]
+        self.bounds = np.searchsorted(word_codes[order], np.arange(len(self.words) + 1))  # Nodes of word i : postings[bounds[i]:bounds[i + 1]]
+
+        self.vocabulary = "\n".join(self.words)  # For substrings, words cannot hold a newline
+        lengths = np.fromiter(map(len, self.words), dtype=np.intp, count=len(self.words))
+        self.vocabulary_starts = np.cumsum(lengths + 1) - (lengths + 1)
+
+    @classmethod
+    def of(cls, labels: List[str], hovers: List[str], external_ids: List[Any]) -> '_SearchIndex':
+        """The index of these texts, reused from a recent one when graph items were rebuilt with the same texts."""
+        with _search_indexes_lock:
+            for index in _search_indexes:
+                if (
+                    index.external_ids == external_ids and index.labels == labels and index.hovers == hovers
+                    and list(map(type, index.external_ids)) == list(map(type, external_ids))  # 1, 1.0 and True are equal ids with different texts
+                ):
+                    _search_indexes.remove(index)
+                    _search_indexes.append(index)
+                    return index
+        index = cls(labels, hovers, external_ids)
+        with _search_indexes_lock:
+            _search_indexes.append(index)
+            del _search_indexes[:-_SEARCH_INDEXES_KEPT]
+        return index
+
+    @staticmethod
+    def _words(label: str, hover: str, external_id: Any) -> List[str]:
+        return f"{label} \x00 {hover} \x00 {external_id}".casefold().split()
+
+    def _range(self, term: str, prefix: bool) -> Tuple[int, int]:
+        """Codes of the words equal to term (or starting with it), a contiguous range of the sorted words."""
+        low = bisect.bisect_left(self.words, term)
+        if not prefix:
+            return low, low + (low < len(self.words) and self.words[low] == term)
+        return low, bisect.bisect_left(self.words, term + "\U0010ffff", low)
+
+    def _containing(self, term: str) -> np.ndarray:
+        """Codes of the words holding term."""
+        positions = np.fromiter((match.start() for match in re.finditer(re.escape(term), self.vocabulary)), dtype=np.intp)
+        return np.unique(np.searchsorted(self.vocabulary_starts, positions, side="right") - 1)
+
+    def _nodes(self, codes: Tuple[int, int] | np.ndarray) -> np.ndarray:
+        """Mask of the nodes holding any of the words, given as a range of codes or an array of codes."""
+        if isinstance(codes, tuple):
+            rows = slice(self.bounds[codes[0]], self.bounds[codes[1]])
+        else:  # The postings of every word, one range after the other
+            starts, lengths = self.bounds[codes], self.bounds[codes + 1] - self.bounds[codes]
+            rows = np.arange(lengths.sum()) + np.repeat(starts - (np.cumsum(lengths) - lengths), lengths)
+        mask = np.zeros(len(self.labels), dtype=bool)
+        mask[self.postings[rows]] = True
+        return mask
+
+    def _phrase(self, node: int, terms: List[str], tier: int) -> bool:
+        """Whether consecutive words of the node match the terms : the first one ends with its term in the substring tier, the last one starts with its term past the whole word tier."""
+        words = self._words(self.labels[node], self.hovers[node], self.external_ids[node])
+        last = len(terms) - 1
+        for start in range(len(words) - last):
+            window = words[start:start + len(terms)]
+            if (
+                (window[0].endswith(terms[0]) if tier == 2 else window[0] == terms[0])
+                and window[1:last] == terms[1:last]
+                and (window[last] == terms[last] if tier == 0 else window[last].startswith(terms[last]))
+            ):
+                return True
+        return False
+
+    def search(self, query: str, limit: int) -> List[int]:
+        """Local ids of the matching nodes : whole word matches first, then words starting with the query, then substring matches."""
+        terms = query.casefold().replace(self._FIELD, " ").split()
+        if not terms or limit <= 0:
+            return []
+        found: Dict[int, None] = {}  # Ordered set
+        for tier in range(3):  # Whole words, prefixes, substrings
+            if len(terms) == 1:
+                candidates = self._nodes(self._containing(terms[0]) if tier == 2 else self._range(terms[0], prefix=tier == 1))
+            else:
+                candidates = self._nodes(self._containing(terms[0]) if tier == 2 else self._range(terms[0], prefix=False))
+                for term in terms[1:-1]:
+                    candidates &= self._nodes(self._range(term, prefix=False))
+                candidates &= self._nodes(self._range(terms[-1], prefix=tier > 0))
+            for node in np.flatnonzero(candidates).tolist():
+                if len(found) >= limit:
+                    return list(found)
+                if node not in found and (len(terms) == 1 or self._phrase(node, terms, tier)):
+                    found[node] = None
+        return list(found)
 
+
+
+class GraphItems(BaseModel):
+    """
+    Stores items for the graph.
+    Nodes and edges are stored as columns, configs as indices into a table of the configs in use,
+    so a large graph costs a few list slots per node instead of one pydantic model each.
+    Node and Edge models are only built at the API boundary (constructor, get_node, nodes, edges).
+    Nodes are indexed by external id, so external ids must be hashable (str, int, tuple...), not lists or dicts.
+    Tuple external ids are dumped to JSON as lists, and loaded back as tuples.
+    """
     node_config: Dict[str, NodeConfig] = {}
     edge_config: Dict[str, EdgeConfig] = {}
 
+    # Node columns
+    _external_ids: List[Any] = PrivateAttr(default_factory=list)
+    _values: List[Any] = PrivateAttr(default_factory=list)
+    _labels: List[str] = PrivateAttr(default_factory=list)
+    _hovers: List[str] = PrivateAttr(default_factory=list)
+    _node_codes: array = PrivateAttr(default_factory=lambda: array("i"))
+
+    # Edge columns, starts and ends are local ids
+    _edge_starts: array = PrivateAttr(default_factory=lambda: array("q"))
+    _edge_ends: array = PrivateAttr(default_factory=lambda: array("q"))
+    _edge_codes: array = PrivateAttr(default_factory=lambda: array("i"))
+
+    # The config objects referred to by the codes, and their codes by id()
+    _node_configs: List[NodeConfig] = PrivateAttr(default_factory=list)
+    _edge_configs: List[EdgeConfig] = PrivateAttr(default_factory=list)
+    _config_codes: Dict[int, int] = PrivateAttr(default_factory=dict)
+
+    # external_id -> local id, kept in sync by the add / remove methods
+    _node_index: Dict[Any, int] = PrivateAttr(default_factory=dict)
+
+    # Indexes built on demand and dropped by the add / remove methods, see _changed(). Derived state, left out of __eq__
+    _adjacency: Dict[str, Tuple[np.ndarray, np.ndarray]] = PrivateAttr(default_factory=dict)  # direction -> compressed adjacency
+    _search_index: Optional['_SearchIndex'] = PrivateAttr(default=None)
+
+    @model_validator(mode="wrap")
+    @classmethod
+    def _load_items(cls, data: Any, handler) -> 'GraphItems':
+        """Accept nodes and edges (models or dicts) like a regular field would, and store them as columns."""
+        nodes, edges = (), ()
+        if isinstance(data, dict) and ("nodes" in data or "edges" in data):
+            data = dict(data)
+            nodes, edges = data.pop("nodes", ()), data.pop("edges", ())
+        items = handler(data)
+        configs: Dict[str, Any] = {}  # Validated dicts make a new config per item, share equal ones
+        for node in nodes:
+            node = Node.model_validate(node)
+            config = configs.setdefault(repr(node.config), node.config)
+            external_id = _from_json_id(node.external_id)
+            value = external_id if node.value == node.external_id else node.value  # Defaults to the external id, a tuple too
+            items._append_node(external_id, value, config, node.label, node.hover)
+        for edge in edges:
+            edge = Edge.model_validate(edge)
+            if not (0 <= edge.start < len(items._external_ids) and 0 <= edge.end < len(items._external_ids)):
+                raise ValueError(f"Edge ({edge.start}, {edge.end}) refers to a missing node")
+            items._append_edge(edge.start, edge.end, configs.setdefault(repr(edge.config), edge.config))
+        return items
+
+    @model_serializer(mode="wrap")
+    def _dump_items(self, handler) -> Dict[str, Any]:
+        data = handler(self)
+        data["nodes"] = [node.model_dump() for node in self.nodes]
+        data["edges"] = [edge.model_dump() for edge in self.edges]
+        return data
+
+    def __eq__(self, other: Any) -> bool:
+        """Equal when the config names, the node and edge columns and each item's config (by value) are equal."""
+        if not isinstance(other, GraphItems):
+            return NotImplemented
+        if not (
+            type(self) is type(other)
+            and self.node_config == other.node_config and self.edge_config == other.edge_config
+            and self._external_ids == other._external_ids and self._labels == other._labels and self._hovers == other._hovers
+            and self._edge_starts == other._edge_starts and self._edge_ends == other._edge_ends
+            and self._values == other._values
+        ):
+            return False
+        # Config tables are built in insertion order, equal items may hold equal configs under different codes
+        same_nodes = self._same_configs(self._node_configs, other._node_configs)
+        same_edges = self._same_configs(self._edge_configs, other._edge_configs)
+        return bool(
+            same_nodes[np.array(self._node_codes, dtype=np.intp), np.array(other._node_codes, dtype=np.intp)].all()
+            and same_edges[np.array(self._edge_codes, dtype=np.intp), np.array(other._edge_codes, dtype=np.intp)].all()
+        )
+
+    def _code(self, table: List[Any], config: Any) -> int:
+        code = self._config_codes.get(id(config))
+        if code is None or code >= len(table) or table[code] is not config:
+            code = len(table)
+            table.append(config)
+            self._config_codes[id(config)] = code
+        return code
+
+    def _changed(self):
+        """Drop the indexes derived from the columns, they are rebuilt on their next use."""
+        self._adjacency.clear()
+        self._search_index = None
+
+    def _append_node(self, external_id: Any, value: Any, config: NodeConfig, label: str, hover: str):
+        try:
+            self._node_index.setdefault(external_id, len(self._external_ids))
+        except TypeError as e:
+            raise _unhashable(e) from None
+        self._changed()
+        self._external_ids.append(external_id)
+        self._values.append(value)
+        self._labels.append(label)
+        self._hovers.append(hover)
+        self._node_codes.append(self._code(self._node_configs, config))
+
+    def _append_edge(self, start: int, end: int, config: EdgeConfig):
+        self._changed()
+        self._edge_starts.append(start)
+        self._edge_ends.append(end)
+        self._edge_codes.append(self._code(self._edge_configs, config))
+
+    # ================================================================== BUILDING
+
     def add_node_config(self, name: str, config: NodeConfig):
         self.node_config[name] = config
 
@@ -67,19 +365,536 @@ class GraphItems(BaseModel):
         self.edge_config[name] = config
 
     def add_node(self, external_id: str, value: Any, config: str, label: str= "", hover: str = ""):
-        self.nodes.append(Node(external_id=external_id, label=label, hover=hover, value=value, config=self.node_config[config]))
+        if not isinstance(label, str) or not isinstance(hover, str):
+            raise TypeError("label and hover must be strings")
+        self._append_node(external_id, value, self.node_config[config], label, hover)
 
     def add_edge(self, start: str, end: str, config: str):  # Start and End are external ids
-        self.edges.append(Edge(config=self.edge_config[config], start=self.get_node_id(start), end=self.get_node_id(end)))
+        self._append_edge(self.get_node_id(start), self.get_node_id(end), self.edge_config[config])
+
+    def add_nodes(
+            self,
+            external_ids: Iterable[Any],
+            values: Optional[Iterable[Any]] = None,
+            config: str | Iterable[str] = "default",
+            labels: Optional[Iterable[str]] = None,
+            hovers: Optional[Iterable[str]] = None,
+        ):
+        """
+        Add many nodes at once from columns (lists, tuples, numpy arrays, pandas series...).
+        Configs are resolved once per name instead of once per node.
+
+        Parameters:
+            external_ids (Iterable[Any]):
+                The external ids of the nodes.
+            values (Iterable[Any], None):
+                The value of each node. Defaults to the external id.
+            config (str, Iterable[str]):
+                A node config name applied to every node, or one name per node.
+            labels (Iterable[str], None):
+                The label of each node. Defaults to empty labels.
+            hovers (Iterable[str], None):
+                The hover text of each node. Defaults to empty hover texts.
+        """
+        external_ids = list(external_ids)
+        count = len(external_ids)
+        values = external_ids if values is None else list(values)
+        labels = [""] * count if labels is None else [str(label) for label in labels]
+        hovers = [""] * count if hovers is None else [str(hover) for hover in hovers]
+        codes = self._resolve_codes(self.node_config, self._node_configs, config, count)
+
+        if not (len(values) == len(labels) == len(hovers) == count):
+            raise ValueError("All node columns must have the same length")
+
+        offset, new_index = len(self._external_ids), {}
+        try:  # Before modifying anything
+            for i, external_id in enumerate(external_ids):
+                new_index.setdefault(external_id, offset + i)
+        except TypeError as e:
+            raise _unhashable(e) from None
+        self._changed()
+        index = self._node_index
+        for external_id, local_id in new_index.items():
+            index.setdefault(external_id, local_id)
+        self._external_ids.extend(external_ids)
+        self._values.extend(values)
+        self._labels.extend(labels)
+        self._hovers.extend(hovers)
+        self._node_codes.extend(codes)
+
+    def add_edges(self, starts: Iterable[Any], ends: Iterable[Any], config: str | Iterable[str] = "default"):
+        """
+        Add many edges at once from columns of start and end external ids.
+
+        Parameters:
+            starts (Iterable[Any]):
+                The external ids of the start nodes.
+            ends (Iterable[Any]):
+                The external ids of the end nodes.
+            config (str, Iterable[str]):
+                An edge config name applied to every edge, or one name per edge.
+        """
+        starts, ends = list(starts), list(ends)
+        if len(starts) != len(ends):
+            raise ValueError("starts and ends must have the same length")
+        codes = self._resolve_codes(self.edge_config, self._edge_configs, config, len(starts))
+
+        index = self._node_index
+        try:
+            start_ids = [index[start] for start in starts]
+            end_ids = [index[end] for end in ends]
+        except KeyError as e:
+            raise ValueError(f"No node with external_id {e.args[0]}") from None
+        self._changed()
+        self._edge_starts.extend(start_ids)
+        self._edge_ends.extend(end_ids)
+        self._edge_codes.extend(codes)
+
+    def _resolve_codes(self, available: Dict[str, Any], table: List[Any], config: str | Iterable[str], count: int) -> List[int]:
+        """Map a config name (or a column of names) to config codes."""
+        if isinstance(config, str):
+            return [self._code(table, available[config])] * count
+        codes_by_name: Dict[str, int] = {}
+        codes = [
+            codes_by_name[name] if name in codes_by_name else codes_by_name.setdefault(name, self._code(table, available[name]))
+            for name in config
+        ]
+        if len(codes) != count:
+            raise ValueError(f"Expected {count} config names, got {len(codes)}")
+        return codes
+
+    def remove_node(self, external_id: Any):
+        """Remove a node and every edge connected to it."""
+        self.remove_nodes([external_id])
+
+    def remove_nodes(self, external_ids: Iterable[Any]):
+        """
+        Remove several nodes and every edge connected to them.
+        Local ids of the remaining nodes are shifted down, edges are remapped accordingly.
+        """
+        removed = np.array(sorted({self.get_node_id(external_id) for external_id in external_ids}), dtype=np.intp)
+        if not len(removed):
+            return
+
+        self._changed()
+        keep = np.ones(len(self._external_ids), dtype=bool)
+        keep[removed] = False
+        remap = np.cumsum(keep) - 1
+        kept = np.flatnonzero(keep).tolist()
+
+        self._external_ids = [self._external_ids[i] for i in kept]
+        self._values = [self._values[i] for i in kept]
+        self._labels = [self._labels[i] for i in kept]
+        self._hovers = [self._hovers[i] for i in kept]
+        self._node_codes = array("i", np.array(self._node_codes, dtype=np.int32)[keep].tobytes())
+
+        starts, ends, codes = self.edge_arrays()
+        kept_edges = keep[starts] & keep[ends]
+        self._edge_starts = array("q", remap[starts[kept_edges]].astype(np.int64).tobytes())
+        self._edge_ends = array("q", remap[ends[kept_edges]].astype(np.int64).tobytes())
+        self._edge_codes = array("i", codes[kept_edges].astype(np.int32).tobytes())
+        self._reindex()
+
+    def remove_edge(self, start: Any, end: Any):
+        """Remove every edge going from start to end (external ids)."""
+        starts, ends, codes = self.edge_arrays()
+        kept = ~((starts == self.get_node_id(start)) & (ends == self.get_node_id(end)))
+        self._changed()
+        self._edge_starts = array("q", starts[kept].astype(np.int64).tobytes())
+        self._edge_ends = array("q", ends[kept].astype(np.int64).tobytes())
+        self._edge_codes = array("i", codes[kept].astype(np.int32).tobytes())
+
+    def _reindex(self):
+        """Rebuild the external_id index. The first node wins on duplicate external ids."""
+        index: Dict[Any, int] = {}
+        for i, external_id in enumerate(self._external_ids):
+            index.setdefault(external_id, i)
+        self._node_index = index
+
+    # ================================================================== ACCESS
+
+    @property
+    def nodes(self) -> Sequence[Node]:
+        return _NodeSequence(self)
+
+    @property
+    def edges(self) -> Sequence[Edge]:
+        return _EdgeSequence(self)
+
+    # The columns themselves, to be read and not modified
+
+    @property
+    def external_ids(self) -> List[Any]:
+        return self._external_ids
+
+    @property
+    def values(self) -> List[Any]:
+        return self._values
+
+    @property
+    def labels(self) -> List[str]:
+        return self._labels
+
+    @property
+    def hovers(self) -> List[str]:
+        return self._hovers
+
+    def node_styles(self) -> Tuple[List[str], List[float]]:
+        """Color and size of every node."""
+        codes = np.array(self._node_codes, dtype=np.intp)
+        colors = np.array([config.color for config in self._node_configs] or [""], dtype=object)
+        sizes = np.array([config.size for config in self._node_configs] or [0.0], dtype=float)
+        return colors[codes].tolist(), sizes[codes].tolist()
+
+    def edge_arrays(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Start local ids, end local ids and config codes of every edge, as copies."""
+        return (
+            np.array(self._edge_starts, dtype=np.intp),
+            np.array(self._edge_ends, dtype=np.intp),
+            np.array(self._edge_codes, dtype=np.intp),
+        )
+
+    def edge_config_of(self, code: int) -> EdgeConfig:
+        """The config of an edge config code from edge_arrays()."""
+        return self._edge_configs[code]
 
     def get_node(self, local_id: int):
-        return self.nodes[local_id]
-    
+        return Node.model_construct(
+            external_id=self._external_ids[local_id],
+            label=self._labels[local_id],
+            hover=self._hovers[local_id],
+            value=self._values[local_id],
+            config=self._node_configs[self._node_codes[local_id]],
+        )
+
+    def get_edge(self, i: int):
+        return Edge.model_construct(config=self._edge_configs[self._edge_codes[i]], start=self._edge_starts[i], end=self._edge_ends[i])
+
     def get_node_id(self, external_id: Any):
-        for i, node in enumerate(self.nodes):
-            if node.external_id == external_id:
-                return i
-        raise ValueError(f"No node with external_id {external_id}")
+        local_id = self._node_index.get(external_id)
+        if local_id is None:
+            raise ValueError(f"No node with external_id {external_id}")
+        return local_id
+
+    def find_node_id(self, external_id: Any) -> Optional[int]:
+        """Like get_node_id, but returns None for unknown external ids."""
+        return self._node_index.get(external_id)
+
+    def _is_external_id(self, value: Any) -> bool:
+        """Whether value is the external id of a node, for arguments taking one external id or several (a tuple can be either)."""
+        try:
+            return value in self._node_index
+        except TypeError:  # Unhashable, such as a list of external ids
+            return False
+
+    def search(self, query: str, limit: int = 20) -> List[Any]:
+        """
+        External ids of the nodes whose label, hover or external id matches the query, case insensitive.
+        Whole words first, then words starting with the query, then texts holding it anywhere, each in local id order.
+        The word index searched is built on the first search and kept until the items are modified.
+
+        Parameters:
+            query (str):
+                The text to look for.
+            limit (int):
+                Maximum number of results.
+        """
+        if self._search_index is None:
+            self._search_index = _SearchIndex.of(self._labels, self._hovers, self._external_ids)
+        return [self._external_ids[i] for i in self._search_index.search(query, limit)]
+
+    # ================================================================== NEIGHBOURHOOD
+
+    def adjacency(self, direction: str = "both") -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Compressed adjacency of the local ids : the neighbours of node i are neighbours[offsets[i]:offsets[i + 1]].
+        Built on first use and kept until the items are modified. Returns (offsets, neighbours).
+
+        Parameters:
+            direction ("both", "out", "in"):
+                Follow edges both ways, from start to end only, or from end to start only.
+        """
+        index = self._adjacency.get(direction)
+        if index is None:
+            starts, ends, _ = self.edge_arrays()
+            if direction == "out":
+                sources, targets = starts, ends
+            elif direction == "in":
+                sources, targets = ends, starts
+            elif direction == "both":
+                sources, targets = np.concatenate([starts, ends]), np.concatenate([ends, starts])
+            else:
+                raise ValueError(f"Unknown direction {direction}, expected 'both', 'out' or 'in'")
+            offsets = np.zeros(len(self._external_ids) + 1, dtype=np.intp)
+            np.cumsum(np.bincount(sources, minlength=len(self._external_ids)), out=offsets[1:])
+            index = self._adjacency[direction] = (offsets, targets[np.argsort(sources, kind="stable")])
+        return index
+
+    def neighbour_ids(self, local_ids: Iterable[int], hops: int = 1, direction: str = "both") -> np.ndarray:
+        """The sorted local ids of the nodes at most hops edges away from the given ones, themselves included."""
+        offsets, neighbours = self.adjacency(direction)
+        seen = np.zeros(len(self._external_ids), dtype=bool)
+        frontier = np.unique(np.fromiter(local_ids, dtype=np.intp))
+        seen[frontier] = True
+        for _ in range(hops):
+            if not len(frontier):
+                break
+            # Gather the neighbour slices of the whole frontier at once
+            firsts, counts = offsets[frontier], offsets[frontier + 1] - offsets[frontier]
+            reached = neighbours[np.repeat(firsts - (np.cumsum(counts) - counts), counts) + np.arange(counts.sum())]
+            frontier = np.unique(reached[~seen[reached]])
+            seen[frontier] = True
+        return np.flatnonzero(seen)
+
+    def neighbours(self, external_ids: Any | Iterable[Any], hops: int = 1, direction: str = "both", include_self: bool = True) -> List[Any]:
+        """
+        The k-hop neighbourhood of some nodes, in local id order.
+
+        Parameters:
+            external_ids (Any, Iterable[Any]):
+                The external id of a node, or of several nodes.
+            hops (int):
+                Maximum number of edges between a returned node and the given ones.
+            direction ("both", "out", "in"):
+                See adjacency().
+            include_self (bool):
+                Whether the given nodes are returned too.
+        """
+        if isinstance(external_ids, str) or not isinstance(external_ids, Iterable) or self._is_external_id(external_ids):
+            external_ids = [external_ids]
+        seeds = {self.get_node_id(external_id) for external_id in external_ids}
+        return [
+            self._external_ids[i] for i in self.neighbour_ids(seeds, hops, direction).tolist()
+            if include_self or i not in seeds
+        ]
+
+    def subgraph(self, external_ids: Iterable[Any]) -> 'GraphItems':
+        """
+        New graph items holding the given nodes and the edges between them, such as subgraph(neighbours(node, hops=2)).
+        Configs are shared with these items, not copied.
+        """
+        kept = np.array(sorted({self.get_node_id(external_id) for external_id in external_ids}), dtype=np.intp)
+        kept_list = kept.tolist()
+
+        items = GraphItems(node_config=dict(self.node_config), edge_config=dict(self.edge_config))
+        items._node_configs, items._edge_configs = list(self._node_configs), list(self._edge_configs)
+        items._config_codes = dict(self._config_codes)
+        items._external_ids = [self._external_ids[i] for i in kept_list]
+        items._values = [self._values[i] for i in kept_list]
+        items._labels = [self._labels[i] for i in kept_list]
+        items._hovers = [self._hovers[i] for i in kept_list]
+        items._node_codes = array("i", np.array(self._node_codes, dtype=np.int32)[kept].tobytes())
+
+        remap = np.full(len(self._external_ids), -1, dtype=np.intp)
+        remap[kept] = np.arange(len(kept))
+        starts, ends, codes = self.edge_arrays()
+        inside = (remap[starts] >= 0) & (remap[ends] >= 0)
+        items._edge_starts = array("q", remap[starts[inside]].astype(np.int64).tobytes())
+        items._edge_ends = array("q", remap[ends[inside]].astype(np.int64).tobytes())
+        items._edge_codes = array("i", codes[inside].astype(np.int32).tobytes())
+        items._reindex()
+        return items
+
+    # ================================================================== DIFF
+
+    def diff(self, other: 'GraphItems') -> GraphItemsDiff:
+        """
+        What changed from these items to other ones, matching nodes by external id and edges by their ends' external ids.
+        Parallel edges are matched in order. Configs are compared by value, node values are not compared.
+        """
+        other_index = other._node_index
+        added = [external_id for external_id in other._node_index if external_id not in self._node_index]
+        removed = [external_id for external_id in self._node_index if external_id not in other_index]
+
+        # Nodes in both, compared column by column
+        common = [(i, other_index[external_id]) for external_id, i in self._node_index.items() if external_id in other_index]
+        restyled = []
+        if common:
+            mine, theirs = np.array(common, dtype=np.intp).T
+            same_config = self._same_configs(self._node_configs, other._node_configs)
+            changed = ~same_config[np.array(self._node_codes, dtype=np.intp)[mine], np.array(other._node_codes, dtype=np.intp)[theirs]]
+            changed |= np.array(self._labels, dtype=object)[mine] != np.array(other._labels, dtype=object)[theirs]
+            changed |= np.array(self._hovers, dtype=object)[mine] != np.array(other._hovers, dtype=object)[theirs]
+            restyled = [self._external_ids[i] for i in mine[changed].tolist()]
+
+        # Edges grouped by their ends, as lists of config codes
+        mine_edges, their_edges = self._edges_by_ends(), other._edges_by_ends()
+        same_config = self._same_configs(self._edge_configs, other._edge_configs)
+        added_edges, removed_edges, restyled_edges = [], [], []
+        for ends, codes in mine_edges.items():
+            other_codes = their_edges.get(ends, [])
+            removed_edges += [ends] * max(0, len(codes) - len(other_codes))
+            if any(not same_config[a, b] for a, b in zip(codes, other_codes)):
+                restyled_edges.append(ends)
+        for ends, codes in their_edges.items():
+            added_edges += [ends] * max(0, len(codes) - len(mine_edges.get(ends, ())))
+
+        return GraphItemsDiff(
+            added_nodes=added,
+            removed_nodes=removed,
+            restyled_nodes=restyled,
+            added_edges=added_edges,
+            removed_edges=removed_edges,
+            restyled_edges=restyled_edges,
+        )
+
+    def _edges_by_ends(self) -> Dict[Tuple[Any, Any], List[int]]:
+        external_ids, edges = self._external_ids, {}
+        for start, end, code in zip(self._edge_starts, self._edge_ends, self._edge_codes):
+            edges.setdefault((external_ids[start], external_ids[end]), []).append(code)
+        return edges
+
+    @staticmethod
+    def _same_configs(mine: List[Any], theirs: List[Any]) -> np.ndarray:
+        """Equality of every pair of configs of two config tables, which only hold a few configs."""
+        same = np.zeros((max(len(mine), 1), max(len(theirs), 1)), dtype=bool)
+        for a, config in enumerate(mine):
+            for b, other_config in enumerate(theirs):
+                same[a, b] = config == other_config
+        return same
+
+
+
+# ===================================================================== LEVEL OF DETAIL
+
+
+
+class _DetailView:
+    """
+    The points a level of detail figure shows : detailed nodes first, then one super-node per collapsed cluster.
+    Points are referred to by their index in the node trace.
+    """
+    def __init__(self, labels: np.ndarray, points: np.ndarray, node_points: np.ndarray, positions: np.ndarray, sizes: np.ndarray, kept_edges: np.ndarray, merged_edges: np.ndarray):
+        self.labels = labels  # Cluster of each node
+        self.points = points  # Local id of each point, -1 - cluster for super-nodes
+        self.node_points = node_points  # Point showing each node, its super-node if collapsed
+        self.positions = positions  # Position of each point
+        self.sizes = sizes  # Number of nodes behind each point
+        self.kept_edges = kept_edges  # Indices of the edges between two detailed nodes
+        self.merged_edges = merged_edges  # (k, 2) point pairs standing for the edges merged into super-nodes
+
+
+
+class LevelOfDetail:
+    """
+    Collapses regions of a large graph into super-nodes so the figure size stays bounded.
+    Nodes are grouped in clusters of equal size by position (or by a custom clustering, such as communities).
+    Clusters holding an expanded or selected node are shown in detail, the others as one super-node each.
+    """
+
+    def __init__(
+            self,
+            max_nodes: int = 2000,
+            max_edges: Optional[int] = None,
+            clustering: Optional[Callable[[np.ndarray, int], np.ndarray]] = None,
+            node_config: Optional[NodeConfig] = None,
+            edge_config: Optional[EdgeConfig] = None,
+        ):
+        """
+        Parameters:
+            max_nodes (int):
+                Maximum number of points in the figure. Graphs up to this size are shown in full.
+                About half of it goes to super-nodes, the rest to expanded clusters.
+            max_edges (int, None):
+                Maximum number of edges merged into super-nodes, the ones standing for the most edges are kept.
+                Defaults to 2 * max_nodes.
+            clustering (Callable[[np.ndarray, int], np.ndarray], None):
+                Maps the (n, dim) node positions and a target cluster count to a cluster label per node.
+                Defaults to equal-size regions of the layout.
+            node_config (NodeConfig, None):
+                Style of the super-nodes, their size grows with the number of nodes they hold.
+            edge_config (EdgeConfig, None):
+                Style of the edges merged into super-nodes.
+        """
+        self.max_nodes = max_nodes
+        self.max_edges = 2 * max_nodes if max_edges is None else max_edges
+        self.clustering = clustering
+        self.node_config = node_config or NodeConfig(color="#7777aa", size=8.0)
+        self.edge_config = edge_config or EdgeConfig(color="#555", width=1.0)
+
+        self.expanded: List[Any] = []  # External ids whose cluster is expanded, most recent last
+
+    def expand(self, external_id: Any):
+        """Expand the cluster of that node."""
+        if external_id in self.expanded:
+            self.expanded.remove(external_id)
+        self.expanded.append(external_id)
+        del self.expanded[:-self.max_nodes]  # More could not be shown anyway
+
+    def collapse_all(self):
+        self.expanded.clear()
+
+    def clusters(self, positions: np.ndarray) -> np.ndarray:
+        target = max(1, self.max_nodes // 2)
+        if self.clustering is not None:
+            return np.asarray(self.clustering(positions, target), dtype=np.intp)
+        return partition_cells(positions, self._splits(target, positions.shape[1]))
+
+    def _splits(self, target: int, dim: int) -> int:
+        """Splits per axis giving the number of cells (splits ** dim) nearest to target, without exceeding max_nodes."""
+        splits = max(1, round(target ** (1 / dim)))
+        while splits > 1 and splits ** dim > target:  # Exact integer root, the float one may be off by one
+            splits -= 1
+        while (splits + 1) ** dim <= target:
+            splits += 1
+        if (splits + 1) ** dim - target < target - splits ** dim and (splits + 1) ** dim <= self.max_nodes:
+            splits += 1
+        return splits
+
+    def view(self, positions: np.ndarray, starts: np.ndarray, ends: np.ndarray, detailed: Sequence[int]) -> Optional[_DetailView]:
+        """
+        Collapse the graph, or return None when it is small enough to be shown in full.
+
+        Parameters:
+            positions (np.ndarray):
+                The (n, dim) positions of the nodes.
+            starts, ends (np.ndarray):
+                The local ids at both ends of each edge.
+            detailed (Sequence[int]):
+                Local ids of the nodes whose cluster should be expanded, by decreasing priority.
+                Clusters are expanded while the figure stays within max_nodes, the first one always is.
+        """
+        n = len(positions)
+        if n <= self.max_nodes:
+            return None
+
+        labels = self.clusters(positions)
+        sizes = np.bincount(labels)
+        expanded = np.zeros(len(sizes), dtype=bool)
+        points_left = self.max_nodes - np.count_nonzero(sizes)
+        for local_id in detailed:
+            cluster = labels[local_id]
+            if not expanded[cluster] and (not expanded.any() or sizes[cluster] - 1 <= points_left):
+                expanded[cluster] = True
+                points_left -= sizes[cluster] - 1
+
+        shown = expanded[labels]
+        detailed_nodes = np.flatnonzero(shown)
+        collapsed = np.flatnonzero(~expanded & (sizes > 0))
+
+        cluster_points = np.full(len(sizes), -1, dtype=np.intp)
+        cluster_points[collapsed] = len(detailed_nodes) + np.arange(len(collapsed))
+        node_points = cluster_points[labels]
+        node_points[detailed_nodes] = np.arange(len(detailed_nodes))
+
+        centers = np.stack([np.bincount(labels, positions[:, d]) for d in range(positions.shape[1])], axis=1)
+        centers[sizes > 0] /= sizes[sizes > 0, None]
+
+        both_shown = shown[starts] & shown[ends]
+        merged = np.sort(np.stack([node_points[starts[~both_shown]], node_points[ends[~both_shown]]], axis=1), axis=1)
+        merged, weights = np.unique(merged[merged[:, 0] != merged[:, 1]].reshape(-1, 2), axis=0, return_counts=True)
+        if len(merged) > self.max_edges:  # Keep the most representative ones
+            merged = merged[np.sort(np.argsort(-weights, kind="stable")[:self.max_edges])]
+
+        return _DetailView(
+            labels=labels,
+            points=np.concatenate([detailed_nodes, -1 - collapsed]),
+            node_points=node_points,
+            positions=np.concatenate([positions[detailed_nodes], centers[collapsed]]),
+            sizes=np.concatenate([np.ones(len(detailed_nodes), dtype=np.intp), sizes[collapsed]]),
+            kept_edges=np.flatnonzero(both_shown),
+            merged_edges=merged,
+        )
 
 
 
@@ -87,15 +902,280 @@ class GraphItems(BaseModel):
 
 
 
+EdgeStyle = Tuple[str, float]  # (color, width)
+RenderBackend = Literal["3d", "webgl"]
+
+_AXES = ("x", "y", "z")
+_building = threading.local()  # graphs : id() of the graphs running build_nodes() on the thread, see InteractiveGraph.__init_subclass__
+_TRACES = {"scatter3d": go.Scatter3d, "scattergl": go.Scattergl}
+
+def _axis_columns(positions: np.ndarray) -> Dict[str, List[Any]]:
+    """The x, y (and z in 3D) coordinate lists of some (n, dim) positions, as trace arguments."""
+    return {axis: positions[:, d].tolist() for d, axis in enumerate(_AXES[:positions.shape[1]])}
+
+class _FigureState:
+    """
+    What compute_figure knows about the figure it built, so the figure can be restyled in place.
+    Positions and edge ends refer to points of the node trace, which are the nodes' local ids unless a level of detail view is shown.
+    Edge styles are stored as codes into a table of distinct styles, one edge trace per style.
+    """
+    def __init__(self, figure: go.Figure, positions: np.ndarray, starts: np.ndarray, ends: np.ndarray, style_codes: np.ndarray, styles: List[EdgeStyle], view: Optional[_DetailView] = None):
+        self.figure = figure
+        self.positions = positions
+        self.starts = starts
+        self.ends = ends
+        self.style_codes = style_codes
+        self.base_codes = style_codes.copy()  # Styles from the graph items, before any override
+        self.styles = styles
+        self.view = view
+        self.edge_traces: Dict[int, int] = {}  # style code -> index of its trace in figure.data
+
+        # Style overrides currently applied on top of the graph items' own configs
+        self.node_overrides: Dict[int, NodeConfig] = {}
+        self.edge_overrides: Dict[int, EdgeConfig] = {}
+
+    def style_code(self, style: EdgeStyle) -> int:
+        if style not in self.styles:
+            self.styles.append(style)
+        return self.styles.index(style)
+
+    @property
+    def trace_type(self) -> str:
+        """Plotly type of the traces of the figure : 3D scatter for 3D positions, WebGL 2D scatter otherwise."""
+        return "scatter3d" if self.positions.shape[1] == 3 else "scattergl"
+
+    def point(self, local_id: int) -> Optional[int]:
+        """The point showing that node, None if it is collapsed into a super-node."""
+        if self.view is None:
+            return local_id
+        point = int(self.view.node_points[local_id])
+        return point if self.view.points[point] == local_id else None
+
+
+
+def _dumps(obj: Any) -> str:
+    """JSON of plain plotly data, with orjson when it is installed."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY).decode()
+        except TypeError:  # Something only plotly's encoder knows, such as pandas values
+            pass
+    return to_json_plotly(obj)
+
+
+
+def _plotly_json(obj: BasePlotlyType) -> Dict[str, Any]:
+    """
+    The plotly JSON of a trace, read through its public properties.
+    Same content as obj.to_plotly_json() without its deep copy, which costs ten times the serialization of a large trace.
+    Unset and empty properties are left out.
+    """
+    data = {}
+    for prop in obj:
+        value = obj[prop]
+        if isinstance(value, BasePlotlyType):
+            value = _plotly_json(value)
+        elif isinstance(value, tuple) and value and isinstance(value[0], BasePlotlyType):
+            value = [_plotly_json(item) for item in value]
+        if value is not None and not (isinstance(value, (dict, list, tuple)) and not value):
+            data[prop] = value
+    return data
+
+
+
+class _FigureJson:
+    """
+    The JSON sent to plotly_events for a figure, cached trace by trace.
+    Plotly change callbacks on the layout and on each trace mark what is modified in place (update_layout, plotly_restyle, property assignments...),
+    traces added, removed or replaced are detected from figure.data. Only what changed is serialized again.
+    """
+    def __init__(self, figure: go.Figure):
+        self.figure = figure
+        self.version = 0
+        self.stats: Dict[str, float] = {}
+        self._traces: List[Optional[str]] = []
+        self._layout: Optional[str] = None
+        self._joined: Optional[str] = None
+        self.payload: Optional[str] = None  # The whole figure, without overlays
+        self._lock = threading.Lock()
+        self._watched: Tuple[int, ...] = ()  # id() of the traces the callbacks are registered on, in figure.data order
+        figure.layout.on_change(self._layout_changed, *figure.layout, append=True)
+        self._watch_traces()
+
+    @property
+    def fingerprint(self) -> Tuple[int, int]:
+        """Identifies the content of the figure, changes whenever it is modified."""
+        self._watch_traces()
+        return id(self.figure), self.version
+
+    def _watch_traces(self):
+        """Register the change callbacks on new traces. Added traces are serialized on their own, removed or moved ones reset every trace."""
+        traces = self.figure.data
+        watched = tuple(map(id, traces))
+        if watched == self._watched:
+            return
+        known = set(self._watched)
+        for trace in traces:
+            if id(trace) not in known:
+                trace.on_change(functools.partial(self._trace_changed, trace), *trace, append=True)
+        appended = watched[:len(self._watched)] == self._watched
+        self._watched = watched
+        self.changed([] if appended else None)
+
+    def _layout_changed(self, *_):
+        self.changed([], layout=True)
+
+    def _trace_changed(self, trace: BasePlotlyType, *_):
+        with self._lock:  # Its index may have moved since the callback was registered
+            i = next((i for i, watched in enumerate(self._watched) if watched == id(trace)), None)
+        if i is not None:
+            self.changed([i])
+
+    def changed(self, traces: Optional[Iterable[int]] = None, layout: bool = False):
+        """Forget the JSON of the given traces (and layout), or of the whole figure when traces is None."""
+        with self._lock:
+            if traces is None:
+                self._traces, layout = [], True
+            for i in traces or ():
+                if i < len(self._traces):
+                    self._traces[i] = None
+            if layout:
+                self._layout = None
+            self._joined = self.payload = None
+            self.version += 1
+
+    def parts(self) -> Tuple[str, str]:
+        """JSON of the traces (without the enclosing brackets) and of the layout, serializing only what changed."""
+        start = time.perf_counter()
+        self._watch_traces()
+        with self._lock:
+            data = self.figure.data
+            if self._joined is not None and len(data) == len(self._traces):
+                self.stats = {"serialization_seconds": time.perf_counter() - start, "serialized_parts": 0, "cached_parts": len(data) + 1}
+                return self._joined, self._layout
+
+            self._traces = (self._traces + [None] * len(data))[:len(data)]
+            serialized = 0
+            for i, trace in enumerate(data):
+                if self._traces[i] is None:
+                    self._traces[i] = _dumps(_plotly_json(trace))
+                    serialized += 1
+            if self._layout is None:
+                self._layout = _dumps(self.figure.layout.to_plotly_json())  # Small, the deep copy is cheap
+                serialized += 1
+
+            self.stats = {
+                "serialization_seconds": time.perf_counter() - start,
+                "serialized_parts": serialized,
+                "cached_parts": len(data) + 1 - serialized,
+            }
+            self._joined = ",".join(self._traces)
+            return self._joined, self._layout
+
+
+
+class _SharedGraph:
+    """
+    The graph items and figure of a graph in shared mode, built once and read by every session.
+    Nothing here is modified after it is built, the selection of each session is drawn as overlay traces.
+    """
+    def __init__(self, graph_items: 'GraphItems', figure: go.Figure, figure_state: Optional[_FigureState]):
+        self.graph_items = graph_items
+        self.figure = figure
+        self.figure_state = figure_state
+        self.figure_json = _FigureJson(figure)
+
+
+
+class _CachedSelection:
+    """What on_update() built for a selection, kept by the selection cache. Also holds the figure's JSON so it is not serialized again."""
+    def __init__(self, graph_items: 'GraphItems', figure: go.Figure, figure_state: Optional[_FigureState], figure_json: _FigureJson):
+        self.graph_items = graph_items
+        self.figure = figure
+        self.figure_state = figure_state
+        self.figure_json = figure_json
+
+
+
+class _FigurePayload:
+    """Stands in for a figure in plotly_events, which only calls to_json() : the cached figure JSON plus some overlay traces."""
+    def __init__(self, figure_json: _FigureJson, overlays: List[Dict[str, Any]] = []):
+        self.figure_json = figure_json
+        self.overlays = overlays
+        self.stats: Dict[str, float] = {}
+
+    def to_json(self) -> str:
+        figure_json = self.figure_json
+        traces, layout = figure_json.parts()
+        start = time.perf_counter()
+        if self.overlays or figure_json.payload is None:
+            data = ",".join([traces] * bool(traces) + [_dumps(overlay) for overlay in self.overlays])
+            payload = '{"data":[' + data + '],"layout":' + layout + '}'
+            if not self.overlays:
+                figure_json.payload = payload
+        else:
+            payload = figure_json.payload
+        self.stats = dict(
+            self.figure_json.stats,
+            serialization_seconds=self.figure_json.stats["serialization_seconds"] + time.perf_counter() - start,
+            payload_bytes=len(payload),
+        )
+        return payload
+
+
+
 class InteractiveGraph(PersistentItem):
     """
     Base class for graph components.
     Manages persistent state, caching, and common graph operations.
     """
 
-    def __init__(self, on_select: List[Callable[[Any, str], None]] = [], graph_items: GraphItems = None):
+    # Config names used by selection_styles() to highlight the selection in delta update mode
+    selected_node_config: str = "selected"
+    selected_edge_config: str = "selected"
+
+    def __init__(
+            self, 
+            on_select: List[Callable[[Any, str], None]] = [], 
+            graph_items: GraphItems = None, 
+            delta_update: bool = False,
+            level_of_detail: Optional[LevelOfDetail] = None,
+            shared_key: Optional[str] = None,
+            fragment: bool = False,
+            render_backend: RenderBackend = "3d",
+            dispatcher: Optional[SelectDispatcher] = None,
+            selection_cache: Optional[SelectionCache] = None,
+        ):
         """
         Initializes the on_select and the graph_items when no node is selected.
+
+        Parameters:
+            delta_update (bool):
+                When True, selecting a node restyles the existing figure (see selection_styles())
+                instead of running on_update(), which would rebuild the graph items and the figure.
+            level_of_detail (LevelOfDetail, None):
+                When set, graphs larger than level_of_detail.max_nodes are displayed with regions collapsed into super-nodes.
+                Clicking a super-node expands it.
+            shared_key (str, None):
+                When set, on_update() runs once for every session of the server, without any selection,
+                and the resulting graph items and figure are shared by the sessions displaying this class with the same shared_key.
+                Each session only keeps its selection and callbacks, the selection is drawn over the shared figure (see selection_styles()).
+                on_update() must then not depend on the session. Super-nodes of the level of detail view cannot be expanded.
+                Call self.invalidate_shared(self.shared_key) to rebuild the shared graph.
+            fragment (bool):
+                Display the graph in a st.fragment, so clicks only rerun the graph instead of the whole app.
+                Anything displayed outside the graph from the selection is only refreshed on the next full rerun.
+            render_backend ("3d", "webgl"):
+                "3d" draws a 3D scatter from a 3D layout. "webgl" draws a 2D WebGL scatter (Scattergl) from a 2D layout,
+                which renders and hit-tests clicks much faster, so large graphs stay interactive.
+            dispatcher (SelectDispatcher, None):
+                Run the on_select callbacks on a thread pool instead of before the rerun, debounced so rapid clicks
+                only run them for the last selection. Their return values are read with self.dispatcher.result(callback).
+            selection_cache (SelectionCache, None):
+                Keep the graph items and figure on_update() built for recent selections, so going back to one of them
+                restores them instead of running on_update(). Entries are keyed by the selection and self.cache_version,
+                set it to a new token when the data behind build_nodes() changes, or call invalidate_selection_cache().
+                Entries whose figure is modified in place (delta update restyles, patch_graph()) are dropped.
         """
         super().__init__()
 
@@ -107,10 +1187,54 @@ class InteractiveGraph(PersistentItem):
         self.selected_external_ids: List[Any] = None
 
         self._update: bool = True  # Triggers update event after the graph is rerun
+        self._restyle: bool = False  # Triggers a selection restyle instead, in delta update mode
+        self.delta_update = delta_update
+        self._figure_state: Optional[_FigureState] = None
+        self._figure_json: Optional[_FigureJson] = None  # Serialized self.figure, see figure_changed()
+        self.payload_stats: Dict[str, float] = {}  # Timing and size of the last figure sent to plotly_events
 
         # This one is solely used for handling the user click events with the plotly_events widget
         self._cached_plotly_selection: Optional[List[Dict[str, Any]]] = None
+
+        # Positions of previously displayed topologies, so the graph does not jump around on every update
+        self.layout_cache = LayoutCache()
+        self.level_of_detail = level_of_detail
+        self.shared_key = shared_key
+        self.fragment = fragment
+        if render_backend not in ("3d", "webgl"):
+            raise ValueError(f"Unknown render backend {render_backend}, expected '3d' or 'webgl'")
+        self.render_backend = render_backend
+        self.dispatcher = dispatcher
+        self.selection_cache = selection_cache
+        self.cache_version: Hashable = None  # Part of the selection cache keys
         
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        if self.shared_key is not None:  # Spilled to disk, the shared objects are fetched again on the next display
+            state.update(graph_items=GraphItems(), figure=None, _figure_state=None)
+        state["_figure_json"] = None  # Cheap to rebuild, and holds a lock
+        return state
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        build_nodes = cls.__dict__.get("build_nodes")
+        if build_nodes is not None and not getattr(build_nodes, "_profiled", False):  # Profiled, it is called from the subclass' own on_update()
+
+            @functools.wraps(build_nodes)
+            def profiled_build_nodes(self, *args, **kwargs):
+                building = _building.__dict__.setdefault("graphs", set())
+                if id(self) in building:  # super().build_nodes() of an overriding subclass, timed by the outermost call
+                    return build_nodes(self, *args, **kwargs)
+                building.add(id(self))
+                try:
+                    with self.profile("build_nodes"):
+                        return build_nodes(self, *args, **kwargs)
+                finally:
+                    building.discard(id(self))
+
+            profiled_build_nodes._profiled = True
+            cls.build_nodes = profiled_build_nodes
+
     # ================================================================== SUBCLASS INTERFACE
 
     @abstractmethod
@@ -136,40 +1260,192 @@ class InteractiveGraph(PersistentItem):
         """
         Displays the graph and process click events.
         """
+        if self.fragment:
+            self.run_fragment("_display", height)
+        else:
+            self._display(height)
+
+    def _display(self, height: int):
         plotly_key = self.key + "_plotly_figure"
 
-        if self._update:
-            self.on_update()
-            self._update = False
-            # self._cached_plotly_selection = None
-            # st.session_state[plotly_key] = None
+        if self.shared_key is not None:
+            with self.profile("shared_graph"):
+                shared = self.shared(self.shared_key, self._build_shared)
+            # References to the shared objects, this session does not hold a copy
+            self.graph_items, self.figure, self._figure_state = shared.graph_items, shared.figure, shared.figure_state
+            self._update = self._restyle = False
+            with self.profile("selection_overlay"):
+                plot = _FigurePayload(shared.figure_json, self.selection_overlay())
 
-        selected_points = self.process_plotly_selection(
-            plotly_events(
-                plot_fig=self.figure,
+        else:
+            figure = self._display_figure()
+            if self._figure_json is None or self._figure_json.figure is not figure:
+                self._figure_json = _FigureJson(figure)
+            plot = _FigurePayload(self._figure_json)
+
+        with self.profile("plotly_events"):  # Serializing and sending the figure
+            plotly_selection = plotly_events(
+                plot_fig=plot,
                 click_event=True,
                 key = plotly_key,
                 override_height=height,
             )
-        )
+        selected_points = self.process_plotly_selection(plotly_selection)
+        self.payload_stats = plot.stats
 
         if selected_points:
             self.select_node(selected_points, rerun=True)
 
+        if self.fragment:  # Fragment reruns do not reach the app's own rerun_if_flag()
+            rerun_if_flag()
+
+    def _display_figure(self) -> go.Figure:
+        """Run the pending update or restyle of self.figure and return it."""
+        if self._update:
+            if not self._restore_selection():
+                with self.profile("on_update"):
+                    self.on_update()
+                self._detach_figure()  # on_update() may have modified a cached figure in place, its JSON follows on its own
+                self._cache_selection()
+            self._update = False
+            self._restyle = self.delta_update and bool(self.selected_external_ids)  # Rebuilt figure, selection not drawn yet
+            # self._cached_plotly_selection = None
+            # st.session_state[plotly_key] = None
+
+        if self._restyle:
+            with self.profile("restyle"):
+                self.restyle_selection()
+            self._restyle = False
+
+        return self.figure
+
+    def figure_changed(self, traces: Optional[Iterable[int]] = None, layout: bool = False):
+        """
+        Call this after modifying self.figure in place, outside of on_update() and restyle_figure(),
+        so the selection cache stops restoring it for other selections. The JSON cached for plotly_events
+        detects in place modifications and new figure objects on its own, this only refreshes it eagerly.
+
+        Parameters:
+            traces (Iterable[int], None):
+                Indexes of the modified traces in self.figure.data, None when anything may have changed.
+            layout (bool):
+                Whether the layout was modified.
+        """
+        if self._figure_json is not None and self._figure_json.figure is self.figure:
+            self._figure_json.changed(traces, layout)
+        self._detach_figure()
+
+    # ================================================================== SELECTION CACHE
+
+    def _selection_key(self) -> Hashable:
+        """Everything on_update() is expected to depend on : the selection, the version token, and what the figure shows."""
+        expanded = tuple(self.level_of_detail.expanded) if self.level_of_detail is not None else ()
+        return (tuple(self.selected_external_ids or ()), self.cache_version, expanded, self.render_backend)
+
+    def _restore_selection(self) -> bool:
+        """Restore what on_update() built for the current selection, if the selection cache still has it."""
+        if self.selection_cache is None:
+            return False
+        with self.profile("selection_cache"):
+            cached: Optional[_CachedSelection] = self.selection_cache.get(self._selection_key())
+            if cached is None:
+                return False
+            self.graph_items, self.figure, self._figure_state = cached.graph_items, cached.figure, cached.figure_state
+            self._figure_json = cached.figure_json
+            return True
+
+    def _cache_selection(self):
+        if self.selection_cache is None or self.figure is None:
+            return
+        if self._figure_json is None or self._figure_json.figure is not self.figure:
+            self._figure_json = _FigureJson(self.figure)  # Shared with the entry, serialized once
+        self.selection_cache.put(self._selection_key(), _CachedSelection(self.graph_items, self.figure, self._figure_state, self._figure_json))
+
+    def _detach_figure(self):
+        """Drop the selection cache entries holding self.figure, before or after it is modified in place."""
+        if self.selection_cache is not None and len(self.selection_cache):
+            figure = self.figure
+            self.selection_cache.discard(lambda key, cached: cached.figure is figure)
+
+    def invalidate_selection_cache(self, external_ids: Optional[List[Any]] = None):
+        """
+        Drop the selection cache entries of a selection (given by external ids, in selection order), or every entry.
+        To invalidate everything when the data changes, setting a new self.cache_version also works.
+        """
+        if self.selection_cache is None:
+            return
+        if external_ids is None:
+            self.selection_cache.clear()
+        else:
+            selection = tuple(external_ids)
+            self.selection_cache.discard(lambda key, cached: key[0] == selection)
+
+    def busy(self) -> bool:
+        return self.dispatcher is not None and self.dispatcher.pending()
+
+    @property
+    def rerun_scope(self) -> RerunScope:
+        return "fragment" if self.fragment else "app"
+
+    @property
+    def layout_dim(self) -> int:
+        """Dimension of the node positions drawn by the render backend."""
+        return 2 if self.render_backend == "webgl" else 3
+
+    def _build_shared(self) -> _SharedGraph:
+        """
+        Run on_update() without any selection, its results are shared by every session.
+        It runs on fresh graph items and figure : the previous shared ones may still be displayed by other sessions,
+        so on_update() must not patch them in place (patch_graph() then computes a new figure).
+        """
+        selected_values, selected_external_ids = self.selected_values, self.selected_external_ids
+        previous = self.graph_items, self.figure, self._figure_state, self._figure_json
+        self.selected_values = self.selected_external_ids = None
+        self.graph_items, self.figure, self._figure_state, self._figure_json = GraphItems(), None, None, None
+        try:
+            self.on_update()
+        except BaseException:
+            self.graph_items, self.figure, self._figure_state, self._figure_json = previous
+            raise
+        finally:
+            self.selected_values, self.selected_external_ids = selected_values, selected_external_ids
+        self.layout_cache.clear()  # The positions now live in the shared figure state
+        return _SharedGraph(self.graph_items, self.figure, self._figure_state)
+
     def process_plotly_selection(self, plotly_selection: List[Dict[str, Any]] | None) -> Optional[List[int]]:
         """
         Handles the value of the plotly_events widget.
         If the value was updated, causes an update to the graph.
         """
         if plotly_selection:
-            if (
-                self._cached_plotly_selection is None
-                or plotly_selection[0]["pointNumber"] != self._cached_plotly_selection[0]["pointNumber"]
-            ):
+            node_curve_number = self._node_curve_number()
+            if node_curve_number is not None and plotly_selection[0].get("curveNumber", node_curve_number) != node_curve_number:
+                return None  # Click on an edge trace, the point number is not a node
+            # NOTE : The widget keeps returning the last click on every rerun. Clicks are told apart by their coordinates too :
+            # when the level of detail renumbers the points, a new click on the last point number lands elsewhere.
+            if self._cached_plotly_selection is None or plotly_selection[0] != self._cached_plotly_selection[0]:
                 self._cached_plotly_selection = plotly_selection
-                return [plotly_selection[0]["pointNumber"]]
+                point = plotly_selection[0]["pointNumber"]
+
+                state = self._figure_state
+                if state is not None and state.view is not None and state.figure is self.figure:
+                    local_id = int(state.view.points[point])
+                    if local_id < 0:  # Super-node
+                        if self.shared_key is None:  # The shared view is the same for everyone
+                            self.expand_cluster(-1 - local_id)
+                        return None
+                    return [local_id]
+                return [point]
         return None
 
+    def expand_cluster(self, cluster: int):
+        """Show the nodes of a super-node of the level of detail view in place of it, from the next rerun."""
+        members = np.flatnonzero(self._figure_state.view.labels == cluster)
+        if len(members):
+            self.level_of_detail.expand(self.graph_items.get_node(int(members[0])).external_id)
+            self._update = True
+            set_rerun_flag(self.key, self.rerun_scope)
+
     def select_node(
             self, 
             ids: int | List[int] | None = None,
@@ -187,7 +1463,8 @@ class InteractiveGraph(PersistentItem):
                 The ids of the nodes to select.
                 Setting both ids and external_ids to None deselects all.
             external_ids (List[Any], Any, None):
-                The external ids of the nodes to select.
+                The external ids of the nodes to select, the ones missing from the graph items are skipped.
+                Raises a ValueError when none of them is in the graph items, the selection is then left as is.
             event (str):
                 The event that triggered the selection.
             ignore_current (bool):
@@ -201,9 +1478,11 @@ class InteractiveGraph(PersistentItem):
         if external_ids is not None:
             if ids is not None:
                 raise ValueError("Cannot provide both ids and external_ids")
-            if isinstance(external_ids, str):
+            if isinstance(external_ids, str) or self.graph_items._is_external_id(external_ids):
                 external_ids = [external_ids]
-            ids = [self.graph_items.get_node_id(external_id=external_id) for external_id in external_ids]
+            ids = [local_id for local_id in map(self.graph_items.find_node_id, external_ids) if local_id is not None]  # Unknown ones are skipped
+            if external_ids and not ids:
+                raise ValueError(f"None of the external ids {list(external_ids)!r} is in the graph items")
         else:
             if isinstance(ids, int):
                 ids = [ids]
@@ -215,18 +1494,47 @@ class InteractiveGraph(PersistentItem):
         if self.selected_external_ids != external_ids or ignore_current:  # Worth updating the graph
         
             self.selected_external_ids = external_ids
-            self._update = True
-
-            for callback in self.on_select:
-                callback(self.selected_values, event)
+            if self.shared_key is not None:
+                pass  # The overlay is drawn from the selection on every display
+            elif self.delta_update and self._figure_state is not None:
+                self._restyle = True
+            else:
+                self._update = True
+
+            if self.dispatcher is not None:
+                self.dispatcher.dispatch(self.on_select, self.selected_values, event)
+            else:
+                for callback in self.on_select:
+                    callback(self.selected_values, event)
 
             if rerun:
-                set_rerun_flag()
+                set_rerun_flag(self.key, self.rerun_scope)
+
+    def search_and_select(self, query: str, count: int = 1, event: str = "search", rerun: bool = False) -> List[Any]:
+        """
+        Select the best matches of a query against the labels, hovers and external ids of the nodes, see GraphItems.search().
+        Meant for a search box, searches look the words up in an index built once per graph items.
+        Nothing happens when nothing matches. Returns the external ids of the selected nodes.
+
+        Parameters:
+            query (str):
+                The text to look for.
+            count (int):
+                Number of matches to select.
+            event (str):
+                The event passed to the on_select callbacks.
+            rerun (bool):
+                Whether to set the streamlit rerun flag, see select_node().
+        """
+        matches = self.graph_items.search(query, limit=count)
+        if matches:
+            self.select_node(external_ids=matches, event=event, rerun=rerun)
+        return matches
 
     def compute_figure(self, 
             figure_height: int = 600,
             node_trace_mode: str = "markers+text",
-            layout: Callable[[nx.DiGraph], List[Tuple[float, float, float]]] = None,
+            layout: LayoutEngine | LayoutArtifact | str | Callable[[nx.DiGraph], List[Tuple[float, float, float]]] = None,
         ) -> go.Figure:
         """
         Compute a plotly figure from the values of self.graph_items.
@@ -236,80 +1544,405 @@ class InteractiveGraph(PersistentItem):
                 Height of the plotly figure
             node_trace_mode (str): 
                 The trace mode for the Node. 
-                See plotly's scatter 3D for more information.
-            layout (Callable[[nx.DiGraph], List[Tuple[float, float, float]]]):
-                A function that produces coordiniates for each node in a networkx digraph structure.
-                Defaults to networkx' spring_layout with a random seed.
-        """
-        layout = layout or (lambda digraph: [pos for id, pos in nx.spring_layout(digraph, dim=3, seed=random.randint(1, 10^3)).items()])
-
-        # Compute node positions
-        positioning: nx.DiGraph = nx.DiGraph()
-
-        for i, node in enumerate(self.graph_items.nodes): positioning.add_node(i)
-        for edge in self.graph_items.edges: positioning.add_edge(edge.start, edge.end)
-
-        positions: List[Tuple[int, int, int]] = layout(positioning)
-
-        # Build the figure
-        fig = go.Figure()
-        node_x, node_y, node_z = [], [], []
-        node_colors, node_sizes, node_labels, node_hover = [], [], [], []
-
-        # Unpacking
-        for node, pos in zip(self.graph_items.nodes, positions):
-            node_x.append(pos[0])
-            node_y.append(pos[1])
-            node_z.append(pos[2])
-            node_colors.append(node.config.color)
-            node_sizes.append(node.config.size)
-            node_labels.append(node.label)
-            node_hover.append(node.hover)
-
-        node_trace = go.Scatter3d(
-            x=node_x,
-            y=node_y,
-            z=node_z,
-            mode=node_trace_mode,
-            marker=dict(
-                size=node_sizes,
-                color=node_colors,
-                line=dict(width=0.5),
-            ),
-            text=node_labels,
-            textposition="top center",
+                See plotly's scatter 3D (or scattergl with the webgl backend) for more information.
+            layout (LayoutEngine, LayoutArtifact, str, Callable[[nx.DiGraph], List[Tuple[float, float, float]]]):
+                A LayoutEngine (such as ForceDirectedLayout for large graphs, possibly running in a thread or process pool),
+                a layout precomputed with build_layout_artifact() (or the path of its .npy file),
+                or a function that produces coordiniates for each node in a networkx digraph structure.
+                Engines are reused or warm-started from self.layout_cache when the graph was laid out before.
+                Nodes missing from an artifact are placed next to their neighbours.
+                Defaults to self.layout_cache.engine, networkx' spring_layout with a random seed.
+                Positions must be 3D with the "3d" render backend and 2D with the "webgl" one.
+        """
+        items = self.graph_items
+        dim = self.layout_dim
+        if isinstance(layout, str):
+            layout = LayoutArtifact.open(layout)
+        if isinstance(layout, LayoutArtifact) and layout.dim != dim:
+            raise ValueError(f"The {self.render_backend} render backend needs a {dim}D layout, {layout.path} is {layout.dim}D")
+        if layout is None or isinstance(layout, LayoutEngine):
+            engine = layout
+            if engine is None and self.layout_cache.engine.dim != dim:
+                engine = SpringLayout(dim=dim)
+            if engine is not None and engine.dim != dim:
+                raise ValueError(f"The {self.render_backend} render backend needs a {dim}D layout engine, got a {engine.dim}D one")
+            layout = lambda digraph: self.layout_cache.layout(digraph, items.external_ids, engine=engine)
+
+        with self.profile("layout"):
+            if isinstance(layout, LayoutArtifact):  # Precomputed, only new nodes need a position
+                positions, placed = layout.lookup(items.external_ids)
+                if not placed.all():
+                    seed_positions(positions, placed, *items.adjacency())
+
+            else:
+                # Compute node positions
+                positioning: nx.DiGraph = nx.DiGraph()
+
+                starts, ends, _ = items.edge_arrays()
+                positioning.add_nodes_from(range(len(items.external_ids)))
+                positioning.add_edges_from(zip(starts.tolist(), ends.tolist()))
+
+                positions = np.asarray(layout(positioning), dtype=float)
+                expected = (len(items.external_ids), dim)
+                if positions.size == 0 and expected[0] == 0:
+                    positions = positions.reshape(expected)
+                if positions.shape != expected:
+                    raise ValueError(f"The layout returned positions of shape {positions.shape}, the {self.render_backend} render backend expects {expected}")
+
+        with self.profile("figure"):
+            # Collapse large graphs into super-nodes
+            state = self._build_figure_state(positions)
+            view = state.view
+
+            # Build the figure
+            fig = go.Figure()
+            state.figure = fig
+            # Read the node columns
+            node_colors, node_sizes = items.node_styles()
+            node_labels, node_hover = items.labels, items.hovers
+
+            if view is not None:  # Detailed nodes, then super-nodes
+                shown = view.points[view.points >= 0].tolist()
+                counts = view.sizes[len(shown):].tolist()
+                super_config = self.level_of_detail.node_config
+                node_colors = [node_colors[i] for i in shown] + [super_config.color] * len(counts)
+                node_sizes = [node_sizes[i] for i in shown] + [super_config.size * (1 + np.log10(count)) for count in counts]
+                node_labels = [node_labels[i] for i in shown] + [str(count) for count in counts]
+                node_hover = [node_hover[i] for i in shown] + [f"{count} nodes, click to expand" for count in counts]
+
+            node_trace = _TRACES[state.trace_type](
+                **_axis_columns(state.positions),
+                mode=node_trace_mode,
+                marker=dict(
+                    size=node_sizes,
+                    color=node_colors,
+                    line=dict(width=0.5),
+                ),
+                text=node_labels,
+                textposition="top center",
+                hoverinfo='none',
+                customdata=node_hover,
+                hovertemplate='<b>%{customdata}</b><extra></extra>',
+                name='Nodes'
+            )
+            # One trace per edge config, segments separated by None
+            for code in range(len(state.styles)):
+                state.edge_traces[code] = len(fig.data)
+                fig.add_trace(self._edge_trace(state, code))
+            fig.add_trace(node_trace)
+            if dim == 3:
+                fig.update_layout(scene=dict(
+                    xaxis=dict(showbackground=False, showticklabels=False, visible=False),
+                    yaxis=dict(showbackground=False, showticklabels=False, visible=False),
+                    zaxis=dict(showbackground=False, showticklabels=False, visible=False),
+                ))
+            else:
+                fig.update_layout(
+                    xaxis=dict(visible=False),
+                    yaxis=dict(visible=False, scaleanchor="x"),  # Keep the layout's proportions
+                    dragmode="pan",
+                    hovermode="closest",
+                )
+            fig.update_layout(
+                plot_bgcolor='rgba(0,0,0,0)',
+                paper_bgcolor='rgba(0,0,0,0)',
+                font=dict(color="white"),
+                height=figure_height,
+                margin=dict(l=0, r=0, b=0, t=0),
+                showlegend=False,
+            )
+            self._figure_state = state
+            return fig
+
+    def _build_figure_state(self, positions: np.ndarray) -> _FigureState:
+        """Group the edges of self.graph_items by (color, width), collapsing the graph first if it is too large."""
+        items = self.graph_items
+        starts, ends, config_codes = items.edge_arrays()
+        styles: Dict[EdgeStyle, int] = {}
+        config_styles = np.array([
+            styles.setdefault((config.color, config.width), len(styles))
+            for config in map(items.edge_config_of, range(config_codes.max() + 1 if len(config_codes) else 0))
+        ], dtype=np.intp)
+        style_codes = config_styles[config_codes] if len(config_codes) else np.zeros(0, dtype=np.intp)
+
+        view = None
+        if self.level_of_detail is not None:
+            view = self.level_of_detail.view(positions, starts, ends, self._detailed_nodes())
+
+        if view is None:
+            return _FigureState(None, positions, starts, ends, style_codes, list(styles))
+
+        kept, merged = view.kept_edges, view.merged_edges
+        merged_style = self.level_of_detail.edge_config
+        merged_code = styles.setdefault((merged_style.color, merged_style.width), len(styles))
+        return _FigureState(
+            None,
+            view.positions,
+            np.concatenate([view.node_points[starts[kept]], merged[:, 0]]),
+            np.concatenate([view.node_points[ends[kept]], merged[:, 1]]),
+            np.concatenate([style_codes[kept], np.full(len(merged), merged_code, dtype=np.intp)]),
+            list(styles),
+            view,
+        )
+
+    def _detailed_nodes(self) -> List[int]:
+        """Local ids of the nodes the level of detail view should expand : the selection, then the most recently expanded."""
+        wanted = list(self.selected_external_ids or []) + self.level_of_detail.expanded[::-1]
+        return [local_id for local_id in map(self.graph_items.find_node_id, wanted) if local_id is not None]
+
+    def _edge_trace(self, state: _FigureState, code: int) -> go.Scatter3d | go.Scattergl:
+        """Build the single line trace of every edge sharing a style instead of one trace per edge."""
+        color, width = state.styles[code]
+        return _TRACES[state.trace_type](
+            **self._edge_coordinates(state, code),
+            mode='lines',
+            line=dict(width=width, color=color),
             hoverinfo='none',
-            customdata=node_hover,
-            hovertemplate='<b>%{customdata}</b><extra></extra>',
-            name='Nodes'
+            showlegend=False
         )
-        for edge in self.graph_items.edges:
-            x0, y0, z0 = positions[edge.start]
-            x1, y1, z1 = positions[edge.end]
-            fig.add_trace(go.Scatter3d(
-                x=[x0, x1, None],
-                y=[y0, y1, None],
-                z=[z0, z1, None],
-                mode='lines',
-                line=dict(width=edge.config.width, color=edge.config.color),
-                hoverinfo='none',
-                showlegend=False
+
+    @classmethod
+    def _edge_coordinates(cls, state: _FigureState, code: int) -> Dict[str, List[Any]]:
+        return cls._segment_coordinates(state, np.flatnonzero(state.style_codes == code))
+
+    @staticmethod
+    def _segment_coordinates(state: _FigureState, members: np.ndarray) -> Dict[str, List[Any]]:
+        """Each edge contributes three points: its start, its end and a None gap. Returns the coordinate lists by axis."""
+        coordinates = np.full((len(members) * 3, state.positions.shape[1]), None, dtype=object)
+        coordinates[0::3] = state.positions[state.starts[members]]
+        coordinates[1::3] = state.positions[state.ends[members]]
+        return _axis_columns(coordinates)
+
+    def _node_curve_number(self) -> Optional[int]:
+        """Index of the node trace in self.figure, plotly_events reports clicks per trace."""
+        if self.figure is not None:
+            for i, trace in enumerate(self.figure.data):
+                if trace.name == 'Nodes':
+                    return i
+        return None
+
+    # ================================================================== DELTA UPDATES
+
+    def selection_styles(self) -> Tuple[Dict[int, NodeConfig], Dict[int, EdgeConfig]]:
+        """
+        Style overrides describing the current selection, used in delta update mode.
+        Returns the configs to apply on top of the graph items, per node local id and per edge index.
+        By default, selected nodes use the node config named self.selected_node_config
+        and edges touching them use the edge config named self.selected_edge_config, when these configs exist.
+        Override this to highlight the selection differently.
+        """
+        items = self.graph_items
+        selected = self._selected_node_ids()
+        node_config = items.node_config.get(self.selected_node_config)
+        edge_config = items.edge_config.get(self.selected_edge_config)
+
+        nodes = {i: node_config for i in selected} if node_config else {}
+        edges = {}
+        if edge_config and selected and self._figure_state is not None:
+            state = self._figure_state
+            points = [point for point in map(state.point, selected) if point is not None]
+            touching = np.isin(state.starts, points) | np.isin(state.ends, points)
+            edges = {int(i): edge_config for i in np.flatnonzero(touching)}
+        return nodes, edges
+
+    def _selected_node_ids(self) -> List[int]:
+        """Local ids of the selected nodes. Selected nodes missing from self.graph_items (dropped by on_update() or a shared rebuild) are deselected."""
+        external_ids = self.selected_external_ids or []
+        local_ids = [self.graph_items.find_node_id(external_id) for external_id in external_ids]
+        if None in local_ids:
+            kept = [i for i, local_id in enumerate(local_ids) if local_id is not None]
+            self.selected_external_ids = [external_ids[i] for i in kept]
+            if self.selected_values is not None and len(self.selected_values) == len(external_ids):
+                self.selected_values = [self.selected_values[i] for i in kept]
+        return [local_id for local_id in local_ids if local_id is not None]
+
+    def restyle_selection(self):
+        """
+        Apply selection_styles() to the current figure, reverting the previous selection's overrides.
+        Falls back to on_update() if self.figure was not built by compute_figure(),
+        or if a selected node is collapsed in a super-node of the level of detail view.
+        """
+        state = self._figure_state
+        if state is None or state.figure is not self.figure or self._selection_collapsed():
+            self.on_update()
+            self._detach_figure()
+            state = self._figure_state
+            if state is None or state.figure is not self.figure:
+                return
+
+        nodes, edges = self.selection_styles()
+        node_patch = {i: self.graph_items.get_node(i).config for i in state.node_overrides if i not in nodes}
+        edge_patch = {i: None for i in state.edge_overrides if i not in edges}
+        node_patch.update(nodes)
+        edge_patch.update(edges)
+
+        self.restyle_figure(node_patch, edge_patch)
+        state.node_overrides, state.edge_overrides = nodes, edges
+
+    def selection_overlay(self) -> List[Dict[str, Any]]:
+        """
+        Traces drawing selection_styles() over the figure, used in shared mode where the figure itself is never restyled.
+        Returns plotly trace dicts : one per edge style, then one for the nodes. They ignore the mouse so clicks reach the nodes below.
+        """
+        state = self._figure_state
+        if state is None or state.figure is not self.figure or not self.selected_external_ids:
+            return []
+
+        # NOTE : plain dicts, validating go traces of a hub node's edges would cost more than the whole display.
+        nodes, edges = self.selection_styles()
+        overlays = []
+
+        by_style: Dict[EdgeStyle, List[int]] = {}
+        for i, config in edges.items():
+            by_style.setdefault((config.color, config.width), []).append(i)
+        for (color, width), members in by_style.items():
+            coordinates = self._segment_coordinates(state, np.array(members, dtype=np.intp))
+            overlays.append(dict(type=state.trace_type, **coordinates, mode="lines", line=dict(color=color, width=width), hoverinfo="skip", showlegend=False))
+
+        shown = [(point, config) for point, config in ((state.point(i), config) for i, config in nodes.items()) if point is not None]
+        if shown:
+            points = [point for point, _ in shown]
+            overlays.append(dict(
+                type=state.trace_type,
+                **_axis_columns(state.positions[points]),
+                mode="markers",
+                marker=dict(color=[config.color for _, config in shown], size=[config.size for _, config in shown], line=dict(width=0.5)),
+                hoverinfo="skip",
+                showlegend=False,
             ))
-        fig.add_trace(node_trace)
-        fig.update_layout(
-            scene=dict(
-                xaxis=dict(showbackground=False, showticklabels=False, visible=False),
-                yaxis=dict(showbackground=False, showticklabels=False, visible=False),
-                zaxis=dict(showbackground=False, showticklabels=False, visible=False),
-            ),
-            plot_bgcolor='rgba(0,0,0,0)',
-            paper_bgcolor='rgba(0,0,0,0)',
-            font=dict(color="white"),
-            height=figure_height,
-            margin=dict(l=0, r=0, b=0, t=0),
-            showlegend=False,
-        )
-        return fig
+        return overlays
+
+    def _selection_collapsed(self) -> bool:
+        state = self._figure_state
+        if state is None or state.view is None or not self.selected_external_ids:
+            return False
+        local_ids = map(self.graph_items.find_node_id, self.selected_external_ids)
+        return any(state.point(local_id) is None for local_id in local_ids if local_id is not None)
+
+    def restyle_figure(self, nodes: Dict[int, NodeConfig] = {}, edges: Dict[int, Optional[EdgeConfig]] = {}):
+        """
+        Patch the style of some nodes (by local id) and edges (by index in the figure) of self.figure, without re-layout.
+        An edge config of None restores the edge's own style. Nodes collapsed in a super-node are skipped.
+        Only the marker arrays and the edge traces whose styles gained or lost edges are touched.
+        """
+        state = self._figure_state
+        figure = self.figure
+        self._detach_figure()
+
+        # NOTE : plotly_restyle skips plotly's per element validation, which would cost more than a full rebuild.
+        # The values come from validated configs and from _edge_trace so this is safe.
+        if nodes:
+            node_curve_number = self._node_curve_number()
+            node_trace = figure.data[node_curve_number]
+            colors, sizes = list(node_trace.marker.color), list(node_trace.marker.size)
+            for i, config in nodes.items():
+                point = state.point(i)
+                if point is not None:
+                    colors[point], sizes[point] = config.color, config.size
+            figure.plotly_restyle({"marker.color": [colors], "marker.size": [sizes]}, trace_indexes=[node_curve_number])
+            self.figure_changed([node_curve_number])
+
+        changed = set()
+        for i, config in edges.items():
+            code = state.base_codes[i] if config is None else state.style_code((config.color, config.width))
+            if state.style_codes[i] != code:
+                changed.update((int(state.style_codes[i]), code))
+                state.style_codes[i] = code
+
+        for code in sorted(changed):
+            if code in state.edge_traces:
+                coordinates = self._edge_coordinates(state, code)
+                figure.plotly_restyle({axis: [values] for axis, values in coordinates.items()}, trace_indexes=[state.edge_traces[code]])
+                self.figure_changed([state.edge_traces[code]])
+            else:
+                state.edge_traces[code] = len(figure.data)
+                figure.add_trace(self._edge_trace(state, code))
+
+    def patch_graph(self, graph_items: GraphItems, **figure_kwargs) -> GraphItemsDiff:
+        """
+        Replace self.graph_items, patching self.figure instead of computing a new one.
+        Shown nodes keep their position and new nodes are placed next to their neighbours, so there is no layout to run,
+        and only the traces whose content changed are restyled. Meant for on_update(), such as :
+
+            def on_update(self):
+                self.patch_graph(self.build_nodes(), layout=ForceDirectedLayout())
+
+        Falls back to compute_figure(**figure_kwargs) when self.figure was not built by compute_figure(),
+        or when the level of detail view collapses the graph (before or after the change).
+        Returns the diff from the previous graph items.
+        """
+        previous, state = self.graph_items, self._figure_state
+        with self.profile("diff"):
+            diff = previous.diff(graph_items)
+
+        if (
+            state is None or state.figure is not self.figure or state.view is not None or state.positions.shape[1] != self.layout_dim
+            or (self.level_of_detail is not None and len(graph_items.external_ids) > self.level_of_detail.max_nodes)
+        ):
+            self.graph_items = graph_items
+            self.figure = self.compute_figure(**figure_kwargs)
+            return diff
+
+        with self.profile("patch"):
+            self._detach_figure()
+            self.graph_items = graph_items
+            patched = self._build_figure_state(self._patched_positions(previous, state.positions))
+            patched.figure = self.figure
+
+            # Keep the edge traces of the previous styles, even emptied, and add traces for new ones
+            styles = list(state.styles)
+            codes = np.array([
+                styles.index(style) if style in styles else styles.append(style) or len(styles) - 1
+                for style in patched.styles
+            ], dtype=np.intp)
+            patched.style_codes = codes[patched.style_codes] if len(patched.style_codes) else patched.style_codes
+            patched.base_codes = patched.style_codes.copy()
+            patched.styles, patched.edge_traces = styles, dict(state.edge_traces)
+            self._figure_state = patched  # Selection overrides are dropped, restyle_selection() draws them again
+
+            # NOTE : same as restyle_figure(), plotly_restyle skips the validation of every element
+            figure = self.figure
+            if diff.added_nodes or diff.removed_nodes or diff.restyled_nodes or state.node_overrides or previous.external_ids != graph_items.external_ids:
+                node_curve_number = self._node_curve_number()
+                colors, sizes = graph_items.node_styles()
+                figure.plotly_restyle({
+                    **{axis: [values] for axis, values in _axis_columns(patched.positions).items()},
+                    "marker.color": [colors],
+                    "marker.size": [sizes],
+                    "text": [list(graph_items.labels)],
+                    "customdata": [list(graph_items.hovers)],
+                }, trace_indexes=[node_curve_number])
+                self.figure_changed([node_curve_number])
+
+            for code in range(len(styles)):
+                new_members = np.flatnonzero(patched.style_codes == code)
+                if code not in patched.edge_traces:
+                    if len(new_members):
+                        patched.edge_traces[code] = len(figure.data)
+                        figure.add_trace(self._edge_trace(patched, code))
+                    continue
+                old_members = np.flatnonzero(state.style_codes == code)
+                if np.array_equal(
+                    state.positions[np.stack([state.starts[old_members], state.ends[old_members]])],
+                    patched.positions[np.stack([patched.starts[new_members], patched.ends[new_members]])],
+                ):
+                    continue  # Same segments
+                coordinates = self._segment_coordinates(patched, new_members)
+                figure.plotly_restyle({axis: [values] for axis, values in coordinates.items()}, trace_indexes=[patched.edge_traces[code]])
+                self.figure_changed([patched.edge_traces[code]])
+
+        return diff
+
+    def _patched_positions(self, previous: GraphItems, positions: np.ndarray) -> np.ndarray:
+        """Positions of the nodes of self.graph_items : shown nodes keep theirs, new ones start next to their placed neighbours."""
+        items = self.graph_items
+        previous_ids = [previous.find_node_id(external_id) for external_id in items.external_ids]
+        placed = np.array([i is not None for i in previous_ids], dtype=bool)
+        patched = np.zeros((len(previous_ids), positions.shape[1]))
+        patched[placed] = positions[[i for i in previous_ids if i is not None]]
+        seed_positions(patched, placed, *items.adjacency())
+        return patched
+
 
 
 
@@ -327,7 +1960,7 @@ class ExampleInteractiveGraph(InteractiveGraph):
     and processes node selection by storing the selected node's label.
     """
     def __init__(self):
-        super().__init__(on_select=[])  # Define callbacks
+        super().__init__(on_select=[], delta_update=True)  # Define callbacks, clicks only restyle the figure
 
     def build_nodes(self) -> GraphItems:
 
@@ -350,8 +1983,8 @@ class ExampleInteractiveGraph(InteractiveGraph):
 
     def on_update(self):
         with st.spinner("Fetching nodes..."): 
-            self.graph_items = self.build_nodes()
-        self.figure = self.compute_figure()
+            graph_items = self.build_nodes()
+        self.patch_graph(graph_items)  # Computes the figure the first time, patches it afterwards
 
 
 
@@ -2,6 +2,10 @@
 from typing import (
     Any,
     Generator,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
 )
 from abc import abstractmethod
 from raphlib.graph import Graph, BaseState, interrupt
@@ -11,6 +15,12 @@ from langchain_core.messages import AIMessage, AIMessageChunk
 import streamlit as st
 from streamlit.delta_generator import DeltaGenerator
 from ._persistent_item import PersistentItem
+from ._chunk_coalescer import ChunkCoalescer, StreamMetrics
+from ._background_stream import BackgroundStream
+from ._chat_log import ChatLog
+from .rerun_flag import set_rerun_flag, rerun_if_flag
+
+_DEFAULT_COALESCER: Any = object()  # Stands for a new ChunkCoalescer per chat
 
 
 
@@ -18,10 +28,48 @@ class LangGraphChat(PersistentItem):
     """
     An interface on top of raphlib's LangGraph graphs.
     """
-    def __init__(self):
+    def __init__(
+            self,
+            history_window: int = 50,
+            coalescer: Optional[ChunkCoalescer] = _DEFAULT_COALESCER,
+            background: bool = False,
+            fragment: bool = False,
+            history_log: Optional[ChatLog] = None,
+            context_window: int = 100,
+        ):
+        """
+        Parameters:
+            history_window (int):
+                Number of most recent messages displayed, older ones are shown history_window at a time with a "load older" button.
+            coalescer (ChunkCoalescer, None):
+                Batches the streamed tokens of a response before they are written, None writes each token as it comes.
+                Defaults to a ChunkCoalescer() of its own.
+            background (bool):
+                Run the graph on a worker thread, the script only reads its events from a queue.
+                A message submitted while the graph runs then cancels the run, at its next event.
+            fragment (bool):
+                Display the chat in a st.fragment, so sending a message only reruns the chat instead of the whole app.
+            history_log (ChatLog, None):
+                Store the conversation in this log instead of memory. The graph's history is then trimmed
+                to its last context_window messages after each run, and older messages are read from the log when shown.
+                A log that already holds messages resumes that conversation.
+            context_window (int):
+                Number of messages the graph's history keeps when history_log is set, which is all the graph sees of the conversation.
+        """
         self.update = True
         self.graph = None
         self.chat_icons = {}  # A mapping of message from the message history to an icon
+        self.history_window = history_window
+        self._shown_messages = history_window
+        self.coalescer = ChunkCoalescer() if coalescer is _DEFAULT_COALESCER else coalescer
+        self.stream_metrics: List[StreamMetrics] = []  # One per response streamed during the last run
+        self.background = background
+        self._run: Optional[BackgroundStream] = None
+        self.fragment = fragment
+        self.history_log = history_log
+        self.context_window = context_window
+        self._logged: Optional[int] = None  # Messages at the start of the graph's history that are in the log, None before the first sync
+        self._older: Tuple[int, int, List[Any]] = (0, 0, [])  # (start, stop, messages) last read from the log
         self.create_graph()
 
 
@@ -53,40 +101,147 @@ class LangGraphChat(PersistentItem):
                         break  # Another tool is being run
                         # raise ValueError(f"Unexpected event while streaming response : {type(ev)}")
 
+            if self.coalescer is not None:
+                metrics = StreamMetrics()
+                self.stream_metrics.append(metrics)
+                response = self.coalescer.coalesce(response_streaming(), metrics)
+            else:
+                response = response_streaming
+
             with message_area: 
                 with st.chat_message("ai", avatar = self.chat_icons.get("ai", None)):
-                    st.write_stream(response_streaming)
+                    st.write_stream(response)
+
+
+    def render_message(self, message: Any) -> str:
+        """
+        The markdown displayed for a message of the history, override this to format messages differently.
+        """
+        if isinstance(message.content, str):
+            return message.content
+        return "\n\n".join(  # Content blocks
+            block if isinstance(block, str) else block.get("text", "")
+            for block in message.content
+        )
+
+    def sync_log(self):
+        """
+        Append the graph's new messages to history_log, then trim the graph's history to the context window.
+        The first sync of a log that already holds messages puts their tail back in the graph's history.
+        Runs at the start of every display, call it to persist messages added elsewhere sooner.
+        """
+        log, messages = self.history_log, self.graph.state.history.messages
+        if self._logged is None:
+            messages[:0] = log.tail(self.context_window)
+            self._logged = min(len(log), self.context_window)
 
+        # NOTE : a cancelled background run may still append its last message meanwhile, it is counted on the next sync.
+        count = len(messages)
+        logged = min(self._logged, count)  # The history may have been truncated
+        log.extend(messages[logged:count])
+        dropped = max(0, count - self.context_window)
+        del messages[:dropped]
+        self._logged = count - dropped
+
+    def _history(self) -> Tuple[int, int, List[Any]]:
+        """Number of messages in the conversation, index of the first one in the graph's history, and the graph's history."""
+        messages = self.graph.state.history.messages
+        if self.history_log is None:
+            return len(messages), 0, messages
+        self.sync_log()
+        total = len(self.history_log)
+        return total, total - len(messages), messages
+
+    def _read_older(self, start: int, stop: int) -> List[Any]:
+        """Messages start to stop of the log, kept while they stay shown so they are not read again on every rerun."""
+        if self._older[:2] != (start, stop):
+            self._older = (start, stop, self.history_log.read(start, stop))
+        return self._older[2]
+
+    def open_stream(self, update: Any, message_area: DeltaGenerator) -> Iterable[Any]:
+        """
+        Start the graph, on a worker thread in background mode.
+        Waits for a cancelled run that is still finishing its current step, they would share the graph's state.
+        """
+        stream = self.graph.stream(update) if isinstance(update, str) else self.graph.stream()  # First run or not
+        if not self.background:
+            return stream
+
+        if self._run is not None and not self._run.finished:
+            with st.spinner("Stopping the previous response..."):
+                self._run.cancel(wait=True)
+
+        with message_area:
+            status = st.empty()
+
+        def waiting(seconds: float):  # Also gives Streamlit a chance to interrupt the script
+            if seconds >= 1:
+                status.caption(f"Working... {seconds:.0f}s")
+            else:
+                status.empty()
+
+        self._run = BackgroundStream(stream, on_wait=waiting).start()
+        return self._run
+
+    def busy(self) -> bool:
+        return self._run is not None and not self._run.finished
+
+    def _load_older(self):
+        self._shown_messages += self.history_window
 
     def display(self, height: int = None, border: bool = False):
+        if self.fragment:
+            self.run_fragment("_display", height, border)
+        else:
+            self._display(height, border)
+
+    def _display(self, height: int, border: bool):
 
         message_area = st.container(height=height, border=border)
 
-        # Display messages from the history
-        with message_area:
-            for message in self.graph.state.history.messages:
+        # Display the most recent messages from the history
+        with message_area, self.profile("history"):
+            total, first_in_memory, messages = self._history()
+            start = max(0, total - self._shown_messages)
+            if start:
+                st.button(f"Load older messages ({start} more)", key=f"{self.key}_load_older", type="tertiary", on_click=self._load_older)
+
+            older = self._read_older(start, first_in_memory) if start < first_in_memory else []
+            for i in range(start, total):
+                message = older[i - start] if i < first_in_memory else messages[i - first_in_memory]
                 with st.chat_message(message.type, avatar = self.chat_icons.get(message.type, None)):
-                    st.markdown(message.content)
+                    st.markdown(self.render_message(message))
 
         if self.update:
 
+            self.stream_metrics = []
+            update, self.update = self.update, None  # Not run again if this run is interrupted by a new message
             # Stream tool calls
-            stream = self.graph.stream(self.update) if isinstance(self.update, str) else self.graph.stream()  # First run or not
+            stream = self.open_stream(update, message_area)
             event = True
 
-            while event is not None:
+            try:
+                with self.profile("stream"):
+                    while event is not None:
+
+                        self.process_event(event, stream=stream, message_area=message_area)
 
-                self.process_event(event, stream=stream, message_area=message_area)
+                        event = None
+                        for event in stream: 
+                            break
 
-                event = None
-                for event in stream: 
-                    break
+            finally:  # Also when Streamlit interrupts the script for a new message
+                if self._run is not None:
+                    self._run.cancel()
+                if self.history_log is not None:
+                    self.sync_log()  # Persist the response now, the user may not come back
 
         # Display Chat Input
         self.update = st.chat_input(self.graph.state.input_hint, key=f"{self.key}_chat_input")
         if self.update:
             self.graph.state.history.append("human", self.update)
-            st.rerun()
+            set_rerun_flag(self.key, "fragment" if self.fragment else "app")
+            rerun_if_flag()
 
 
 
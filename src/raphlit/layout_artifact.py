@@ -0,0 +1,185 @@
+"""
+Layouts precomputed offline, so no session pays for laying out a large graph.
+
+A layout artifact is two files : a (n, dim) float32 .npy array of positions, memory-mapped when opened so every session
+and worker process reads the same pages, and a JSON file next to it with the external id of each row
+and the version (inode, size, modification time) of the .npy file these ids go with.
+
+Build one from a GraphItems dumped with graph_items.model_dump_json() :
+    python -m raphlit.layout_artifact graph.json layout.npy [--dim 3] [--iterations 50] [--seed 0]
+"""
+
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    Hashable,
+    List,
+    Optional,
+    Tuple,
+)
+
+import argparse
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+from ._layout_engine import LayoutEngine, ForceDirectedLayout
+
+if TYPE_CHECKING:
+    from .interactive_graph import GraphItems
+
+_opened: Dict[Tuple[str, Tuple[int, ...]], 'LayoutArtifact'] = {}  # Shared by every session of the worker
+_opened_lock = threading.Lock()
+
+_OPEN_ATTEMPTS = 20  # While the artifact is being rewritten, 0.05 s apart
+
+
+def _ids_path(path: str) -> str:
+    return os.path.splitext(path)[0] + ".ids.json"
+
+
+def _version(path: str) -> Tuple[int, ...]:
+    """Changes whenever the file is replaced : a rewritten artifact is a new file moved in place, with a new inode."""
+    stat = os.stat(path)
+    return (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+
+def _json_id(external_id: Any) -> Any:
+    """json.dump fallback for the numpy scalars add_nodes() accepts as external ids."""
+    if isinstance(external_id, np.generic):
+        return external_id.item()
+    raise TypeError(f"External id {external_id!r} of type {type(external_id).__name__} is not JSON serializable")
+
+
+def _from_json_id(external_id: Any) -> Any:
+    """The external id dumped to JSON as external_id : JSON turns tuples into lists, which are never valid (hashable) external ids."""
+    if isinstance(external_id, list):
+        return tuple(map(_from_json_id, external_id))
+    return external_id
+
+
+
+class LayoutArtifact:
+    """
+    Positions of the nodes of a graph by external id, read from a memory-mapped .npy file.
+    Use LayoutArtifact.open() rather than the constructor, so the artifact is mapped once per process.
+    External ids must be JSON serializable, lists come back as tuples.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        # The ids must go with the mapped positions : read both again while a rewrite replaces them
+        for _ in range(_OPEN_ATTEMPTS):
+            version = _version(path)
+            with open(_ids_path(path)) as file:
+                ids = json.load(file)
+            self.positions: np.ndarray = np.load(path, mmap_mode="r")
+            if _version(path) == version and tuple(ids["positions"]) == version:
+                break
+            time.sleep(0.05)
+        else:
+            raise ValueError(f"The external ids next to {path} belong to another version of it, build the artifact again")
+        self.version = version
+        self.external_ids: List[Hashable] = list(map(_from_json_id, ids["external_ids"]))
+        if len(self.external_ids) != len(self.positions):
+            raise ValueError(f"{path} holds {len(self.positions)} positions for {len(self.external_ids)} external ids")
+        self._index: Dict[Hashable, int] = {}
+        for i, external_id in enumerate(self.external_ids):
+            self._index.setdefault(external_id, i)
+
+    @classmethod
+    def open(cls, path: str) -> 'LayoutArtifact':
+        """The artifact at path, mapped once per process. Rewriting the file makes the next call open the new version."""
+        path = os.path.abspath(path)
+        key = (path, _version(path))
+        with _opened_lock:
+            if key not in _opened:
+                for stale in [k for k in _opened if k[0] == path]:
+                    del _opened[stale]
+                _opened[key] = cls(path)
+            return _opened[key]
+
+    def __reduce__(self):  # Pickled as its path, the positions are mapped again instead of copied
+        return (LayoutArtifact.open, (self.path,))
+
+    def __len__(self) -> int:
+        return len(self.external_ids)
+
+    @property
+    def dim(self) -> int:
+        return self.positions.shape[1]
+
+    def lookup(self, external_ids: List[Hashable]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Positions of some nodes. Returns a (n, dim) float array, and the mask of the nodes found in the artifact.
+        Rows of missing nodes are zeros. Only the requested rows are read from the file.
+        """
+        rows = np.fromiter((self._index.get(external_id, -1) for external_id in external_ids), dtype=np.intp, count=len(external_ids))
+        found = rows >= 0
+        positions = np.zeros((len(rows), self.dim))
+        positions[found] = self.positions[rows[found]]
+        return positions, found
+
+
+def build_layout_artifact(graph_items: 'GraphItems', path: str, engine: Optional[LayoutEngine] = None) -> LayoutArtifact:
+    """
+    Lay out graph items and write the positions to path (a .npy file) and their external ids next to it.
+    Meant for batch jobs, the layout runs on the calling thread.
+
+    Parameters:
+        graph_items (GraphItems):
+            The graph to lay out.
+        path (str):
+            The .npy file to write, the external ids go to the same path with a .ids.json extension.
+        engine (LayoutEngine, None):
+            The engine computing the positions. Defaults to a 3D ForceDirectedLayout.
+    """
+    engine = engine or ForceDirectedLayout()
+    starts, ends, _ = graph_items.edge_arrays()
+    positions = engine.compute(len(graph_items.external_ids), np.stack([starts, ends], axis=1))
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    # Written aside then moved in place. The ids record the version of the positions they go with,
+    # so sessions opening the artifact in between wait for the ids of the new positions.
+    temporary = (path + ".tmp", _ids_path(path) + ".tmp")
+    try:
+        with open(temporary[0], "wb") as file:
+            np.save(file, positions.astype(np.float32))
+        with open(temporary[1], "w") as file:
+            json.dump({"positions": _version(temporary[0]), "external_ids": graph_items.external_ids}, file, default=_json_id)
+        os.replace(temporary[0], path)
+        os.replace(temporary[1], _ids_path(path))
+    except BaseException:
+        for leftover in temporary:
+            if os.path.exists(leftover):
+                os.remove(leftover)
+        raise
+    return LayoutArtifact.open(path)
+
+
+def main():
+    from .interactive_graph import GraphItems
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("graph", help="JSON dump of a GraphItems")
+    parser.add_argument("output", help="The .npy file to write")
+    parser.add_argument("--dim", type=int, default=3, help="2 for the webgl render backend")
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    with open(args.graph) as file:
+        graph_items = GraphItems.model_validate_json(file.read())
+    start = time.perf_counter()
+    artifact = build_layout_artifact(graph_items, args.output, ForceDirectedLayout(dim=args.dim, iterations=args.iterations, seed=args.seed))
+    print(f"Laid out {len(artifact)} nodes in {time.perf_counter() - start:.1f} s, wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
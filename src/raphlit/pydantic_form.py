@@ -1,11 +1,16 @@
 
 from typing import (
+    Any,
+    Dict,
     List,
     Optional,
+    Set,
 )
-from pydantic import BaseModel
+from pydantic import BaseModel, PrivateAttr
 from abc import abstractmethod, ABC
 
+import copy
+
 from ._persistent_item import PersistentItem
 import streamlit as st
 
@@ -13,17 +18,69 @@ class PydanticForm(BaseModel, PersistentItem):
     """
     A form that will persist in the session state through a pydantic model.
     An instance of this model can be edited at any point in the code and the changes will be reflected in the form.
+    Fields assigned a different value are tracked as dirty until the next commit(), see diff().
+    NOTE : Tracking is per field, in place edits of a field's value (such as appending to a list) are not seen.
     """
-    
+
+    _committed: Dict[str, Any] = PrivateAttr(default_factory=dict)  # Committed value of each dirty field
+
+    def __setattr__(self, name: str, value: Any):
+        if name in type(self).model_fields:
+            self._track(name, value)
+        super().__setattr__(name, value)
+
+    def _track(self, name: str, value: Any):
+        committed = self._committed
+        if name in committed:
+            if _same(committed[name], value):  # Back to the committed value
+                del committed[name]
+        elif not _same(self.__dict__.get(name), value):
+            committed[name] = self.__dict__.get(name)
+
+    # ================================================================== DIRTY TRACKING
+
+    @property
+    def dirty_fields(self) -> Set[str]:
+        """Fields whose value changed since the last commit."""
+        return set(self._committed)
+
+    def diff(self) -> Dict[str, Any]:
+        """The current value of the fields that changed since the last commit."""
+        return {name: self.__dict__[name] for name in self._committed}
+
+    def mark_clean(self):
+        """Consider the current values as committed."""
+        self._committed.clear()
+
+    # ================================================================== UPDATES
+
     def update(self, replacement_model: Optional[BaseModel] = None, **kwargs):
         """
         Update the form with the given keyword arguments or (non keyword) instance of the current model to update from.
+        Only the values that differ from the current ones are validated and applied, all at once :
+        if any of them is invalid, a ValidationError is raised and the form is left unchanged.
         """
         if replacement_model:
-            self.update(**replacement_model.model_dump(exclude_unset=True))
+            values = {name: getattr(replacement_model, name) for name in replacement_model.model_fields_set}
         else:
-            for key, value in kwargs.items():
-                setattr(self, key, value)
+            values = kwargs
+
+        changes = {name: value for name, value in values.items() if not _same(self.__dict__.get(name, _MISSING), value)}
+        if not changes:
+            return
+        if replacement_model:  # Its nested models and lists must not be shared with the form
+            changes = copy.deepcopy(changes)
+
+        # Validate on a shallow copy so a failure leaves the form untouched
+        batch = self.model_copy()
+        for name, value in changes.items():
+            self.__pydantic_validator__.validate_assignment(batch, name, value)
+
+        for name in changes:
+            if name in type(self).model_fields:
+                self._track(name, batch.__dict__[name])
+            self.__dict__[name] = batch.__dict__[name]
+        self.__pydantic_fields_set__.update(name for name in changes if name in type(self).model_fields)
 
     def update_from_model(self, instance: 'PydanticForm'):
         """
@@ -31,7 +88,7 @@ class PydanticForm(BaseModel, PersistentItem):
         """
         if not isinstance(instance, self.__class__):
             raise ValueError(f"Instance of class {type(instance)} does not have the expected input type")
-        self.update(**instance.model_dump(exclude_unset=True))
+        self.update(instance)
     
     def display(self) -> 'PydanticForm':
         """
@@ -45,10 +102,20 @@ class PydanticForm(BaseModel, PersistentItem):
 
     def commit(self):
         """
-        Commit the changes made in the form to the model.
+        Commit the changes made in the form : on_commit() receives the fields edited since the last commit,
+        which are then considered clean. Nothing is called if no field changed.
+        """
+        diff = self.diff()
+        if diff:
+            self.on_commit(diff)
+        self.mark_clean()
+
+    def on_commit(self, diff: Dict[str, Any]):
+        """
+        Persist the edited fields, by name.
         NOTE : This method is not implemented by default.
         """
-        raise NotImplementedError("If using the form's commit method you must implement it. Otherwise, code the commit behavior directly in the page.")
+        raise NotImplementedError("If using the form's commit method you must implement on_commit. Otherwise, code the commit behavior directly in the page.")
     
     def delete(self):
         """
@@ -58,3 +125,16 @@ class PydanticForm(BaseModel, PersistentItem):
 
     def __call__(self) -> 'PydanticForm':
         return self.display()
+
+
+
+_MISSING = object()
+
+def _same(a: Any, b: Any) -> bool:
+    """Equality that never raises, values that cannot be compared (such as arrays) count as different."""
+    if a is b:
+        return True
+    try:
+        return bool(a == b)
+    except Exception:
+        return False
@@ -1,15 +1,80 @@
 
 from typing import (
+    Callable,
+    Dict,
     Optional,
     Literal,
 )
 import streamlit as st
+from streamlit.runtime import Runtime
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 
-def rerun_if_flag(scope: Optional[Literal["app", "fragment"]] = None):
-    if "rerun_flag" in st.session_state:
-        del st.session_state["rerun_flag"]
-        st.rerun(scope=scope) if scope else st.rerun()
+RerunScope = Literal["app", "fragment"]
 
-def set_rerun_flag():
-    st.session_state["rerun_flag"] = True
-    
\ No newline at end of file
+# Requests gathered during a script run, requester -> scope. They are honored by a single rerun.
+_REQUESTS_KEY = "rerun_flag"
+_LAST_REQUESTS_KEY = "rerun_flag_last"
+
+
+def _fragment_run() -> bool:
+    """Whether the script is running a fragment on its own, the only case where a fragment scoped rerun is allowed."""
+    ctx = get_script_run_ctx()
+    return bool(ctx is not None and ctx.fragment_ids_this_run and getattr(ctx, "current_fragment_id", None))
+
+def _session_rerun() -> Callable[[], None]:
+    """
+    A function rerunning the whole app of the current session when called from any thread, such as a worker whose results the app shows.
+    Does nothing outside of a Streamlit server (bare mode, AppTest) or once the session ended.
+    """
+    ctx = get_script_run_ctx()
+    if ctx is None or not Runtime.exists():
+        return lambda: None
+    session_id = ctx.session_id
+
+    def rerun():
+        # NOTE : Streamlit has no public API for this, AppSession.request_rerun() must run on the session's event loop
+        info = Runtime.instance()._session_mgr.get_active_session_info(session_id)
+        if info is not None:
+            info.session._event_loop.call_soon_threadsafe(info.session.request_rerun, None)
+    return rerun
+
+def pending_reruns() -> Dict[str, RerunScope]:
+    """The rerun requests made since the last rerun, by requester."""
+    requests = st.session_state.get(_REQUESTS_KEY)
+    return dict(requests) if isinstance(requests, dict) else {}
+
+def last_reruns() -> Dict[str, RerunScope]:
+    """The requests the last rerun honored, by requester. Useful to find out what keeps rerunning the app."""
+    return dict(st.session_state.get(_LAST_REQUESTS_KEY, {}))
+
+def rerun_if_flag(scope: Optional[RerunScope] = None):
+    """
+    Rerun once if any rerun was requested since the last one.
+
+    Parameters:
+        scope ("app", "fragment", None):
+            Forces the scope of the rerun. By default only the current fragment reruns
+            when every request asked for a fragment rerun and a fragment is running on its own, the whole app otherwise.
+    """
+    if _REQUESTS_KEY in st.session_state:
+        requests = pending_reruns()
+        del st.session_state[_REQUESTS_KEY]
+        if scope is None:
+            scope = "fragment" if requests and "app" not in requests.values() and _fragment_run() else "app"
+        st.session_state[_LAST_REQUESTS_KEY] = requests
+        st.rerun(scope=scope)
+
+def set_rerun_flag(requester: str = "default", scope: RerunScope = "app"):
+    """
+    Request a rerun from the next call to rerun_if_flag(). Requests made during a script run are coalesced into a single rerun.
+
+    Parameters:
+        requester (str):
+            Who requests the rerun, such as the key of a persistent item. See last_reruns().
+        scope ("app", "fragment"):
+            "fragment" when only the fragment making the request needs to rerun.
+    """
+    requests = pending_reruns()
+    if requests.get(requester) != "app":  # The widest scope wins
+        requests[requester] = scope
+    st.session_state[_REQUESTS_KEY] = requests